@@ -0,0 +1,38 @@
+import logging
+import redis
+
+from contextlib import contextmanager
+from django.conf import settings
+from redis.exceptions import LockError
+
+logger = logging.getLogger("logger")
+
+CRAWL_LOCK_NAME = "pokemons:crawl-lock"
+
+
+class CrawlInProgress(Exception):
+    """Raised when another crawl already holds the crawl lock."""
+
+
+@contextmanager
+def crawl_lock(name=CRAWL_LOCK_NAME):
+    """
+    Hold a Redis lock for the duration of a crawl, so only one crawl runs at a time across hosts.
+
+    The lock expires after ``CRAWL_LOCK_TIMEOUT`` seconds in case the crawler dies without releasing it.
+
+    Raises:
+        CrawlInProgress: If the lock is already held.
+    """
+    client = redis.Redis.from_url(settings.CRAWL_LOCK_URL)
+    lock = client.lock(name, timeout=settings.CRAWL_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        raise CrawlInProgress(name)
+
+    try:
+        yield
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            logger.warning("Crawl lock expired before the crawl finished")
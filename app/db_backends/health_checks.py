@@ -0,0 +1,39 @@
+class HealthCheckMixin:
+    """
+    Database wrapper mixin backporting Django 4.1's ``CONN_HEALTH_CHECKS``.
+
+    With ``CONN_HEALTH_CHECKS`` enabled, a persistent connection reused from a previous
+    request is pinged once, just before its first use in the new request, and replaced if
+    the server dropped it. Connections opened during the request are not checked, and
+    requests that never use the database do not ping it.
+    """
+
+    health_check_done = False
+
+    def connect(self):
+        # A new connection needs no check, including while connect() itself uses it.
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        self.close_if_health_check_failed()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        # Runs at the start and end of each request. Django's own checks here must not
+        # trigger the ping; the connection is checked again before its next use.
+        self.health_check_done = True
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or self.health_check_done
+            or not self.settings_dict.get("CONN_HEALTH_CHECKS", False)
+        ):
+            return
+
+        self.health_check_done = True
+        if not self.is_usable():
+            self.close()
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from app.db_backends.health_checks import HealthCheckMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    pass
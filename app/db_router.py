@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY_DB_ALIAS = "default"
+REPLICA_DB_ALIAS = "replica"
+ROUTED_APP_LABELS = {"pokemons"}
+
+_use_primary = ContextVar("use_primary", default=False)
+
+
+@contextmanager
+def use_primary():
+    """
+    Pin every read made inside the block to the primary database.
+
+    Used by the crawler, which must read its own writes and should not add load to the replica.
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads of the routed apps to the replica when one is configured, and all writes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APP_LABELS or _use_primary.get():
+            return PRIMARY_DB_ALIAS
+        if REPLICA_DB_ALIAS in settings.DATABASES:
+            return REPLICA_DB_ALIAS
+        return PRIMARY_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary.
+        aliases = {PRIMARY_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
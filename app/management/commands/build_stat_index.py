@@ -0,0 +1,16 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from pokemons.stat_index import build_stat_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("logger")
+
+
+class Command(BaseCommand):
+    """Build the stat index used by /stat-search from the stored Pokemon stats."""
+
+    def handle(self, *args, **options) -> None:
+        indexed_count = build_stat_index()
+        logger.info(f"Built stat index with {indexed_count} Pokemon")
@@ -1,46 +1,256 @@
+import argparse
+import hashlib
+import json
 import logging
 import requests
 import re
 
+from datetime import timedelta
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from typing import List
+from django.db.models import F, Q
+from django.utils import timezone
+from typing import List, Optional
 
-from pokemons.models import Pokemon, PokemonAbility, PokemonStats, PokemonType
+from app.crawl_lock import CrawlInProgress, crawl_lock
+from app.db_router import use_primary
+from app.resource_graph import ResourceGraph, extract_resource_id
+from pokemons.models import (
+    Ability,
+    Pokemon,
+    PokemonAbility,
+    PokemonChange,
+    PokemonStats,
+    PokemonType,
+    Species,
+    Type,
+)
+from pokemons.response_cache import get_catalogue_version
+from pokemons.stat_index import build_stat_index
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("logger")
 
 POKEAPI_BASE_URL = "https://pokeapi.co/api/v2/pokemon"
+SYNC_BATCH_SIZE = 50
+AGE_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+def parse_id_list(value) -> List[str]:
+    """
+    Parse a comma-separated list of Pokemon IDs, e.g. ``1,25,150``.
+    """
+    pokemon_ids = [pokemon_id.strip() for pokemon_id in value.split(",")]
+    if not all(pokemon_id.isdigit() for pokemon_id in pokemon_ids):
+        raise argparse.ArgumentTypeError(f"Invalid Pokemon ID list: {value}")
+    return pokemon_ids
+
+
+def parse_positive_int(value) -> int:
+    """
+    Parse a strictly positive integer.
+    """
+    try:
+        parsed = int(value)
+    except ValueError:
+        parsed = 0
+    if parsed < 1:
+        raise argparse.ArgumentTypeError(f"Must be a positive integer: {value}")
+    return parsed
+
+
+def parse_age(value) -> timedelta:
+    """
+    Parse an age such as ``30m``, ``12h`` or ``7d``.
+    """
+    match = re.fullmatch(r"(\d+)([smhdw])", value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid age: {value}")
+    return timedelta(**{AGE_UNITS[match.group(2)]: int(match.group(1))})
 
 
 class Command(BaseCommand):
     """Update or create Pokemon records using data from the PokeAPI."""
 
-    def handle(self, *args, **kwargs) -> None:
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.failed_pokemon_ids = []
+        self.resource_graph = None
+        # Linked resource URLs stored during the current run
+        self.available_resource_urls = set()
+        # URLs the PokeAPI answered with 404 Not Found
+        self.not_found_urls = set()
+
+    def add_arguments(self, parser) -> None:
+        selection = parser.add_mutually_exclusive_group()
+        selection.add_argument(
+            "--ids",
+            type=parse_id_list,
+            help="Only refresh these Pokemon, e.g. 1,25,150.",
+        )
+        selection.add_argument(
+            "--stale-after",
+            type=parse_age,
+            help="Only refresh stored Pokemon last fetched longer ago than this, e.g. 7d.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=parse_positive_int,
+            help="Refresh at most this many Pokemon.",
+        )
+
+    def handle(self, *args, **options) -> None:
         logger.info("Starting Pokemon data update")
-        self.update_or_create_all()
+        pokemon_ids = options.get("ids")
+        stale_after = options.get("stale_after")
+        limit = options.get("limit")
+
+        try:
+            with crawl_lock(), use_primary():
+                catalogue_version = get_catalogue_version()
+                if pokemon_ids:
+                    self.update_or_create_many(pokemon_ids[:limit])
+                elif stale_after:
+                    self.update_or_create_many(
+                        self.get_stale_pokemon_ids(stale_after, limit)
+                    )
+                else:
+                    self.update_or_create_all(limit)
+
+                if get_catalogue_version() != catalogue_version:
+                    self.rebuild_stat_index()
+        except CrawlInProgress:
+            logger.warning("Another Pokemon data update is running, skipping.")
+            return
+
+        if self.failed_pokemon_ids:
+            logger.warning(
+                f"Data update finished, {len(self.failed_pokemon_ids)} Pokemon not saved."
+            )
+            return
         logger.info("Data update successful.")
 
-    def update_or_create_all(self) -> None:
+    def update_or_create_all(self, limit=None) -> None:
         """
         Update or create Pokemon records for all available Pokemon using data fetched from the PokeAPI.
+
+        Parameters:
+            limit (int): The maximum number of Pokemon to refresh. Defaults to all of them.
         """
         pokemons_ids = self.get_all_pokemon_ids()
+        if pokemons_ids is None:
+            return
+
+        self.update_or_create_many(pokemons_ids[:limit])
+        self.delete_missing_records(pokemons_ids)
+
+    def get_stale_pokemon_ids(self, stale_after, limit=None) -> List[int]:
+        """
+        Find stored Pokemon that have not been fetched recently, least recently fetched first.
+
+        Parameters:
+            stale_after (timedelta): How long ago a Pokemon must have been fetched to be stale.
+            limit (int): The maximum number of IDs to return.
+
+        Returns:
+            A list of pokemon IDs.
+        """
+        fetched_before = timezone.now() - stale_after
+        stale_pokemons = Pokemon.objects.filter(
+            Q(last_fetched_at__lt=fetched_before) | Q(last_fetched_at__isnull=True)
+        ).order_by(F("last_fetched_at").asc(nulls_first=True), "pokemon_id")
+        return list(stale_pokemons.values_list("pokemon_id", flat=True)[:limit])
+
+    def rebuild_stat_index(self) -> None:
+        """
+        Rebuild the stat index after data changed.
+
+        A failure is logged rather than raised: the crawled data is already saved, and
+        searches keep using the previous index until the next successful rebuild.
+        """
+        try:
+            indexed_count = build_stat_index()
+        except Exception as err:
+            logger.error(f"Error rebuilding stat index: {err}")
+            return
+        logger.info(f"Rebuilt stat index with {indexed_count} Pokemon")
+
+    def update_or_create_many(self, pokemons_ids) -> None:
+        """
+        Update or create the given Pokemon records using data fetched from the PokeAPI.
+
+        Parameters:
+            pokemons_ids (List[str]): The pokemon IDs to refresh.
+        """
         pokemon_count = len(pokemons_ids)
         processed_pokemons = 0
+        batch = []
+        missing_ids = []
 
-        for pokemon_id in pokemons_ids:
-            try:
-                self.update_or_create_record(pokemon_id)
+        try:
+            for pokemon_id in pokemons_ids:
+                pokemon_data = self.fetch_pokemon_data(pokemon_id)
+                if pokemon_data is None:
+                    logger.warning(f"Pokemon {pokemon_id} not found")
+                    missing_ids.append(pokemon_id)
+                    continue
+
+                batch.append(pokemon_data)
                 processed_pokemons += 1
+                if len(batch) >= SYNC_BATCH_SIZE:
+                    self.sync_records(batch)
+                    batch = []
 
                 if processed_pokemons % 20 == 0:
                     logger.info(
                         f"{round((processed_pokemons/pokemon_count) * 100, 1)}% completed"
                     )
-            except:
-                logger.warning(f"Pokemon {pokemon_id} not found")
+
+            if batch:
+                self.sync_records(batch)
+        finally:
+            self.close_resource_graph()
+
+        # Stamp stored Pokemon the PokeAPI no longer has, so stale refreshes do not keep
+        # retrying them ahead of the rest; the next full crawl deletes them. Pokemon that
+        # failed for any other reason, such as an outage, stay due for a refresh.
+        Pokemon.objects.filter(
+            pokemon_id__in=[
+                pokemon_id
+                for pokemon_id in missing_ids
+                if str(pokemon_id).isdigit()
+                and self.pokemon_url(pokemon_id) in self.not_found_urls
+            ]
+        ).update(last_fetched_at=timezone.now())
+
+    def delete_missing_records(self, pokemon_ids) -> None:
+        """
+        Delete Pokemon records no longer listed by the PokeAPI and record the deletions.
+
+        Parameters:
+            pokemon_ids (List[str]): The pokemon IDs currently listed by the PokeAPI.
+        """
+        listed_ids = {
+            int(pokemon_id) for pokemon_id in pokemon_ids if pokemon_id.isdigit()
+        }
+        if not listed_ids:
+            return
+
+        stored_ids = set(Pokemon.objects.values_list("pokemon_id", flat=True))
+        stale_ids = stored_ids - listed_ids
+        if not stale_ids:
+            return
+
+        with transaction.atomic():
+            Pokemon.objects.filter(pokemon_id__in=stale_ids).delete()
+            PokemonChange.objects.bulk_create(
+                [
+                    PokemonChange(pokemon_id=pokemon_id, action=PokemonChange.DELETED)
+                    for pokemon_id in sorted(stale_ids)
+                ]
+            )
+        logger.info(f"Deleted {len(stale_ids)} Pokemon no longer listed by the PokeAPI")
 
     def update_or_create_record(self, pokemon_id) -> None:
         """
@@ -50,55 +260,525 @@ class Command(BaseCommand):
             pokemon_id (str): The pokemon ID from the pokemon url.
         """
         try:
-            pokemon_url = f"{POKEAPI_BASE_URL}/{pokemon_id}"
-            response = requests.get(pokemon_url)
+            pokemon_data = self.fetch_pokemon_data(pokemon_id)
+            if pokemon_data is not None:
+                self.sync_records([pokemon_data])
+        finally:
+            self.close_resource_graph()
+
+    def fetch_pokemon_data(self, pokemon_id) -> Optional[dict]:
+        """
+        Fetch a single Pokemon payload from the PokeAPI.
+
+        Parameters:
+            pokemon_id (str): The pokemon ID from the pokemon url.
+
+        Returns:
+            The decoded payload, or None if the PokeAPI did not return it.
+        """
+        return self.fetch_resource(self.pokemon_url(pokemon_id))
+
+    def pokemon_url(self, pokemon_id) -> str:
+        return f"{POKEAPI_BASE_URL}/{pokemon_id}"
+
+    def fetch_resource(self, url) -> Optional[dict]:
+        """
+        Fetch a single resource from the PokeAPI.
+
+        Parameters:
+            url (str): The resource URL.
+
+        Returns:
+            The decoded payload, or None if the PokeAPI did not return it. URLs answered
+            with 404 Not Found are also added to ``not_found_urls``.
+        """
+        try:
+            response = requests.get(url)
             if response.status_code == 200:
-                pokemon_data = response.json()
-
-                with transaction.atomic():
-                    pokemon, created = Pokemon.objects.update_or_create(
-                        pokemon_id=pokemon_data["id"],
-                        pokemon_name=pokemon_data["name"],
-                        defaults={
-                            "height":pokemon_data["height"],
-                            "weight":pokemon_data["weight"],
-                            "base_experience":pokemon_data["base_experience"],
+                return response.json()
+            if response.status_code == 404:
+                self.not_found_urls.add(url)
+        except Exception as e:
+            logger.warning(f"Unexpected response from PokeAPI: {e}")
+        return None
+
+    def sync_records(self, payloads) -> None:
+        """
+        Bring the stored rows for a batch of Pokemon in line with their PokeAPI payloads.
+
+        Malformed payloads are dropped one by one. If saving the batch fails, its records
+        are retried one at a time so a single bad record cannot drop the rest.
+
+        Parameters:
+            payloads (List[dict]): Pokemon payloads returned by the PokeAPI.
+        """
+        valid_payloads = []
+        for pokemon_data in payloads:
+            try:
+                int(pokemon_data["id"])
+                self.compute_content_hash(pokemon_data)
+                valid_payloads.append(pokemon_data)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                self.record_failure(pokemon_data, f"Invalid PokeAPI payload: {e!r}")
+        if not valid_payloads:
+            return
+
+        try:
+            self.save_records(valid_payloads)
+        except Exception as e:
+            if len(valid_payloads) == 1:
+                self.record_failure(
+                    valid_payloads[0], f"Error saving Pokemon data: {e}"
+                )
+                return
+
+            logger.warning(f"Error saving Pokemon batch, retrying one at a time: {e}")
+            for pokemon_data in valid_payloads:
+                try:
+                    self.save_records([pokemon_data])
+                except Exception as e:
+                    self.record_failure(pokemon_data, f"Error saving Pokemon data: {e}")
+
+    def record_failure(self, pokemon_data, reason) -> None:
+        pokemon_id = pokemon_data.get("id") if isinstance(pokemon_data, dict) else None
+        self.failed_pokemon_ids.append(pokemon_id)
+        logger.warning(f"Pokemon {pokemon_id} not saved. {reason}")
+
+    def save_records(self, payloads) -> None:
+        """
+        Save a batch of valid Pokemon payloads.
+
+        Pokemon whose content hash is unchanged are skipped. For the rest, existing child rows
+        are loaded once per table and diffed in memory, so each table receives at most one
+        bulk insert, one bulk update and one delete.
+
+        Parameters:
+            payloads (List[dict]): Pokemon payloads returned by the PokeAPI.
+        """
+        payloads = {pokemon_data["id"]: pokemon_data for pokemon_data in payloads}
+        self.sync_linked_resources(payloads.values())
+        content_hashes = {
+            pokemon_id: self.compute_content_hash(pokemon_data)
+            for pokemon_id, pokemon_data in payloads.items()
+        }
+        existing_hashes = dict(
+            Pokemon.objects.filter(pokemon_id__in=payloads).values_list(
+                "pokemon_id", "content_hash"
+            )
+        )
+        changed = {
+            pokemon_id: pokemon_data
+            for pokemon_id, pokemon_data in payloads.items()
+            if pokemon_id not in existing_hashes
+            or existing_hashes[pokemon_id] != content_hashes[pokemon_id]
+        }
+        unchanged = {
+            pokemon_id: pokemon_data
+            for pokemon_id, pokemon_data in payloads.items()
+            if pokemon_id not in changed
+        }
+        fetched_at = timezone.now()
+        Pokemon.objects.filter(pokemon_id__in=unchanged).update(
+            last_fetched_at=fetched_at
+        )
+        self.relink_resources(unchanged)
+        if not changed:
+            return
+
+        pokemons = [
+            Pokemon(
+                pokemon_id=pokemon_id,
+                pokemon_name=pokemon_data["name"],
+                height=pokemon_data["height"],
+                weight=pokemon_data["weight"],
+                base_experience=pokemon_data["base_experience"],
+                content_hash=content_hashes[pokemon_id],
+                last_fetched_at=fetched_at,
+                species_id=self.linked_resource_id(
+                    pokemon_data.get("species", {}).get("url")
+                ),
+            )
+            for pokemon_id, pokemon_data in changed.items()
+        ]
+        created = [p for p in pokemons if p.pokemon_id not in existing_hashes]
+        updated = [p for p in pokemons if p.pokemon_id in existing_hashes]
+
+        with transaction.atomic():
+            Pokemon.objects.bulk_create(created)
+            Pokemon.objects.bulk_update(
+                updated,
+                [
+                    "pokemon_name",
+                    "height",
+                    "weight",
+                    "base_experience",
+                    "content_hash",
+                    "last_fetched_at",
+                    "species",
+                ],
+            )
+
+            # Sync Pokemon abilities
+            self.sync_child_rows(
+                PokemonAbility,
+                "ability_name",
+                {
+                    pokemon_id: {
+                        info["ability"]["name"]: {
+                            "is_hidden": info["is_hidden"],
+                            "ability_id": self.linked_resource_id(
+                                info["ability"].get("url")
+                            ),
                         }
+                        for info in pokemon_data["abilities"]
+                    }
+                    for pokemon_id, pokemon_data in changed.items()
+                },
+            )
+
+            # Sync Pokemon types
+            self.sync_child_rows(
+                PokemonType,
+                "type_name",
+                {
+                    pokemon_id: {
+                        info["type"]["name"]: {
+                            "type_url": info["type"]["url"],
+                            "type_id": self.linked_resource_id(info["type"]["url"]),
+                        }
+                        for info in pokemon_data["types"]
+                    }
+                    for pokemon_id, pokemon_data in changed.items()
+                },
+            )
+
+            # Sync Pokemon stats
+            self.sync_child_rows(
+                PokemonStats,
+                "base_stat_name",
+                {
+                    pokemon_id: {
+                        info["stat"]["name"]: {
+                            "effort": info["effort"],
+                            "base_stat_num": info["base_stat"],
+                        }
+                        for info in pokemon_data["stats"]
+                    }
+                    for pokemon_id, pokemon_data in changed.items()
+                },
+            )
+
+            PokemonChange.objects.bulk_create(
+                [
+                    PokemonChange(
+                        pokemon_id=pokemon.pokemon_id,
+                        action=PokemonChange.UPDATED
+                        if pokemon.pokemon_id in existing_hashes
+                        else PokemonChange.CREATED,
                     )
+                    for pokemon in pokemons
+                ]
+            )
 
-                    # Update Pokemon abilities
-                    for ability_info in pokemon_data["abilities"]:
-                        PokemonAbility.objects.update_or_create(
-                            pokemon=pokemon,
-                            ability_name=ability_info["ability"]["name"],
-                            defaults={
-                                "is_hidden": ability_info["is_hidden"]
-                            },
-                        )
-
-                    # Update Pokemon types
-                    for type_info in pokemon_data["types"]:
-                        PokemonType.objects.update_or_create(
-                            pokemon=pokemon,
-                            type_name=type_info["type"]["name"],
-                            defaults={
-                                "type_url":type_info["type"]["url"]
-                            }
-                        )
-
-                    # Update Pokemon stats
-                    for stat_info in pokemon_data["stats"]:
-                        PokemonStats.objects.update_or_create(
-                            pokemon=pokemon,
-                            base_stat_name=stat_info["stat"]["name"],
-                            defaults={
-                                "effort": stat_info["effort"],
-                                "base_stat_num": stat_info["base_stat"],
-                            },
-                        )
+    def relink_resources(self, payloads) -> None:
+        """
+        Link stored rows of unchanged Pokemon to linked resources that were not available
+        when the rows were saved.
 
-        except Exception as e:
-            logger.warning(f"Unexpected response from PokeAPI: {e}")
+        Links are not part of the served documents, so no change is recorded.
+
+        Parameters:
+            payloads (Dict[int, dict]): Unchanged Pokemon payloads, keyed by pokemon ID.
+        """
+        if not payloads:
+            return
+
+        unlinked_pokemon_ids = Pokemon.objects.filter(
+            pokemon_id__in=payloads, species__isnull=True
+        ).values_list("pokemon_id", flat=True)
+        self.fill_links(
+            Pokemon,
+            "species_id",
+            {
+                pokemon_id: payloads[pokemon_id].get("species", {}).get("url")
+                for pokemon_id in unlinked_pokemon_ids
+            },
+        )
+
+        ability_urls = {
+            (pokemon_id, info["ability"]["name"]): info["ability"].get("url")
+            for pokemon_id, pokemon_data in payloads.items()
+            for info in pokemon_data["abilities"]
+        }
+        unlinked_abilities = PokemonAbility.objects.filter(
+            pokemon_id__in=payloads, ability__isnull=True
+        ).values_list("id", "pokemon_id", "ability_name")
+        self.fill_links(
+            PokemonAbility,
+            "ability_id",
+            {
+                row_id: ability_urls.get((pokemon_id, ability_name))
+                for row_id, pokemon_id, ability_name in unlinked_abilities
+            },
+        )
+
+        unlinked_types = PokemonType.objects.filter(
+            pokemon_id__in=payloads, type__isnull=True
+        ).values_list("id", "type_url")
+        self.fill_links(PokemonType, "type_id", dict(unlinked_types))
+
+    def fill_links(self, model, link_field, urls) -> None:
+        """
+        Set a missing link on rows whose linked resource is now available.
+
+        Parameters:
+            model (Model): The model holding the link.
+            link_field (str): The link's ``<field>_id`` attribute.
+            urls (Dict[int, str]): The linked resource URL of each row missing the link, by primary key.
+        """
+        pks_by_resource_id = {}
+        for pk, url in urls.items():
+            resource_id = self.linked_resource_id(url)
+            if resource_id is not None:
+                pks_by_resource_id.setdefault(resource_id, []).append(pk)
+
+        for resource_id, pks in pks_by_resource_id.items():
+            model.objects.filter(pk__in=pks).update(**{link_field: resource_id})
+
+    def get_resource_graph(self) -> ResourceGraph:
+        """
+        Return the resource graph for the current run, creating it on first use.
+        """
+        if self.resource_graph is None:
+            self.resource_graph = ResourceGraph(
+                self.fetch_resource, settings.CRAWLER_RESOURCE_CONCURRENCY
+            )
+            self.available_resource_urls = set()
+        return self.resource_graph
+
+    def close_resource_graph(self) -> None:
+        if self.resource_graph is not None:
+            self.resource_graph.close()
+            self.resource_graph = None
+
+    def sync_linked_resources(self, payloads) -> None:
+        """
+        Fetch and store the types, abilities and species linked from a batch of Pokemon.
+
+        Each linked URL is fetched and stored at most once per run.
+
+        Parameters:
+            payloads (Iterable[dict]): Pokemon payloads returned by the PokeAPI.
+        """
+        graph = self.get_resource_graph()
+        discovered = {"type": set(), "ability": set(), "species": set()}
+        for pokemon_data in payloads:
+            discovered["type"].update(
+                info["type"].get("url") for info in pokemon_data["types"]
+            )
+            discovered["ability"].update(
+                info["ability"].get("url") for info in pokemon_data["abilities"]
+            )
+            discovered["species"].add(pokemon_data.get("species", {}).get("url"))
+
+        resource_models = {
+            "type": (Type, self.build_type, ["type_name", "damage_relations"]),
+            "ability": (
+                Ability,
+                self.build_ability,
+                ["ability_name", "effect", "short_effect"],
+            ),
+            "species": (
+                Species,
+                self.build_species,
+                [
+                    "species_name",
+                    "capture_rate",
+                    "base_happiness",
+                    "is_legendary",
+                    "is_mythical",
+                ],
+            ),
+        }
+        for kind, urls in discovered.items():
+            urls = {
+                url
+                for url in urls
+                if extract_resource_id(url) is not None
+                and url not in self.available_resource_urls
+            }
+            if not urls:
+                continue
+
+            model, build, fields = resource_models[kind]
+            fetched = graph.resolve(kind, urls)
+            resources = [
+                build(extract_resource_id(url), data)
+                for url, data in fetched.items()
+                if data is not None
+            ]
+            with transaction.atomic():
+                self.store_resources(model, resources, fields)
+
+            # Resources that failed to fetch can still be linked if an earlier run stored them.
+            stored_ids = set(
+                model.objects.filter(
+                    pk__in=[extract_resource_id(url) for url in urls]
+                ).values_list("pk", flat=True)
+            )
+            self.available_resource_urls.update(
+                url for url in urls if extract_resource_id(url) in stored_ids
+            )
+
+    def store_resources(self, model, resources, fields) -> None:
+        """
+        Bulk insert or update linked resources.
+        """
+        resource_ids = [resource.pk for resource in resources]
+        existing_ids = set(
+            model.objects.filter(pk__in=resource_ids).values_list("pk", flat=True)
+        )
+        model.objects.bulk_create(
+            [resource for resource in resources if resource.pk not in existing_ids]
+        )
+        model.objects.bulk_update(
+            [resource for resource in resources if resource.pk in existing_ids],
+            fields,
+        )
+
+    def linked_resource_id(self, url) -> Optional[int]:
+        """
+        Return the ID of a stored linked resource, or None if it is not available.
+        """
+        if url in self.available_resource_urls:
+            return extract_resource_id(url)
+        return None
+
+    def build_type(self, type_id, data) -> Type:
+        return Type(
+            type_id=type_id,
+            type_name=data.get("name"),
+            damage_relations={
+                relation: [related["name"] for related in related_types]
+                for relation, related_types in data.get("damage_relations", {}).items()
+            },
+        )
+
+    def build_ability(self, ability_id, data) -> Ability:
+        english_entry = next(
+            (
+                entry
+                for entry in data.get("effect_entries", [])
+                if entry["language"]["name"] == "en"
+            ),
+            {},
+        )
+        return Ability(
+            ability_id=ability_id,
+            ability_name=data.get("name"),
+            effect=english_entry.get("effect"),
+            short_effect=english_entry.get("short_effect"),
+        )
+
+    def build_species(self, species_id, data) -> Species:
+        return Species(
+            species_id=species_id,
+            species_name=data.get("name"),
+            capture_rate=data.get("capture_rate"),
+            base_happiness=data.get("base_happiness"),
+            is_legendary=data.get("is_legendary"),
+            is_mythical=data.get("is_mythical"),
+        )
+
+    def sync_child_rows(self, model, key_field, desired) -> None:
+        """
+        Diff the stored child rows of a batch of Pokemon against the desired rows and apply the difference.
+
+        Parameters:
+            model (Model): The child model, with a ``pokemon`` foreign key.
+            key_field (str): The field identifying a row within one Pokemon.
+            desired (Dict[int, Dict[str, dict]]): Per Pokemon ID, the wanted field values keyed by ``key_field``.
+        """
+        value_fields = sorted(
+            {
+                field
+                for rows in desired.values()
+                for values in rows.values()
+                for field in values
+            }
+        )
+        existing_rows = model.objects.filter(pokemon_id__in=desired).only(
+            "id", "pokemon_id", key_field, *value_fields
+        )
+
+        seen = set()
+        to_update = []
+        to_delete = []
+        for row in existing_rows:
+            key = (row.pokemon_id, getattr(row, key_field))
+            wanted = desired[row.pokemon_id].get(key[1])
+            if wanted is None or key in seen:
+                to_delete.append(row.pk)
+                continue
+
+            seen.add(key)
+            if any(getattr(row, field) != value for field, value in wanted.items()):
+                for field, value in wanted.items():
+                    setattr(row, field, value)
+                to_update.append(row)
+
+        to_create = [
+            model(pokemon_id=pokemon_id, **{key_field: key}, **values)
+            for pokemon_id, rows in desired.items()
+            for key, values in rows.items()
+            if (pokemon_id, key) not in seen
+        ]
+
+        if to_delete:
+            model.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            model.objects.bulk_update(to_update, value_fields)
+        if to_create:
+            model.objects.bulk_create(to_create)
+
+    def compute_content_hash(self, pokemon_data) -> str:
+        """
+        Hash the parts of a PokeAPI payload that are stored, so unchanged Pokemon can be skipped.
+
+        Whether linked resources resolved is not part of the hash: missing links are
+        filled in by ``relink_resources`` without recording a change.
+
+        Parameters:
+            pokemon_data (dict): The Pokemon payload returned by the PokeAPI.
+
+        Returns:
+            str: The hex SHA-256 digest of the stored fields.
+        """
+        content = {
+            "name": pokemon_data["name"],
+            "height": pokemon_data["height"],
+            "weight": pokemon_data["weight"],
+            "base_experience": pokemon_data["base_experience"],
+            "species": pokemon_data.get("species", {}).get("url"),
+            "abilities": sorted(
+                (
+                    info["ability"]["name"],
+                    info["is_hidden"],
+                    info["ability"].get("url"),
+                )
+                for info in pokemon_data["abilities"]
+            ),
+            "types": sorted(
+                (info["type"]["name"], info["type"]["url"])
+                for info in pokemon_data["types"]
+            ),
+            "stats": sorted(
+                (info["stat"]["name"], info["effort"], info["base_stat"])
+                for info in pokemon_data["stats"]
+            ),
+        }
+        encoded = json.dumps(content, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
 
     def get_all_pokemon_ids(self) -> List[str]:
         """
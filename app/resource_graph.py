@@ -0,0 +1,80 @@
+import re
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+
+def extract_resource_id(url) -> Optional[int]:
+    """
+    Extracts the numeric ID from a PokeAPI resource URL such as ``.../type/12/``.
+
+    Parameters:
+        url (str): The resource URL.
+
+    Returns:
+        int: The resource ID, or None if the URL does not end with one.
+    """
+    match = re.search(r"/(\d+)/?$", url or "")
+    if match:
+        return int(match.group(1))
+    return None
+
+
+class ResourceGraph:
+    """
+    De-duplicating fetcher for linked PokeAPI resources.
+
+    Concurrent requests for the same URL share a single future, and a URL that failed is
+    not fetched again for the lifetime of the graph. Fetched payloads are handed to the
+    caller by ``resolve`` and not retained; callers keep track of what they stored.
+    Fetches of each resource kind are limited to that kind's concurrency budget.
+    """
+
+    def __init__(
+        self, fetch: Callable[[str], Optional[dict]], concurrency: Dict[str, int]
+    ) -> None:
+        self._fetch = fetch
+        self._budgets = {
+            kind: threading.BoundedSemaphore(limit)
+            for kind, limit in concurrency.items()
+        }
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(concurrency.values()),
+            thread_name_prefix="resource-graph",
+        )
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, url) -> Future:
+        """
+        Return the future for a resource, scheduling its fetch if it was not requested before.
+        """
+        with self._lock:
+            future = self._futures.get(url)
+            if future is None:
+                future = self._executor.submit(self._fetch_within_budget, kind, url)
+                self._futures[url] = future
+        return future
+
+    def resolve(self, kind, urls: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """
+        Fetch every URL of one kind concurrently and wait for all of them.
+
+        Returns:
+            A mapping of URL to payload, or None for URLs that could not be fetched.
+        """
+        futures = {url: self.get(kind, url) for url in set(urls)}
+        results = {url: future.result() for url, future in futures.items()}
+        with self._lock:
+            for url, data in results.items():
+                if data is not None and self._futures.get(url) is futures[url]:
+                    del self._futures[url]
+        return results
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _fetch_within_budget(self, kind, url) -> Optional[dict]:
+        with self._budgets[kind]:
+            return self._fetch(url)
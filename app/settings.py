@@ -39,10 +39,41 @@ CELERY_TIMEZONE = "Europe/London"
 CELERY_BEAT_SCHEDULE = {
     "update_pokemon_data_task": {
         "task": "pokemons.tasks.update_pokemon_data",
-        "schedule": crontab(minute=0, hour=0),  # Task scheduled to run daily at 12.00AM
+        # Full crawl weekly, Sunday 12.00AM
+        "schedule": crontab(minute=0, hour=0, day_of_week=0),
     },
+    "refresh_stale_pokemon_data_task": {
+        "task": "pokemons.tasks.update_pokemon_data",
+        "schedule": crontab(minute=30),  # Rolling refresh hourly, at half past
+        "args": ("--stale-after", "1d", "--limit", "100"),
+    },
+}
+
+# Only one crawl runs at a time, guarded by a Redis lock
+CRAWL_LOCK_URL = os.environ.get("CRAWL_LOCK_URL", CELERY_BROKER_URL)
+CRAWL_LOCK_TIMEOUT = 6 * 60 * 60  # seconds
+
+# Maximum concurrent PokeAPI requests per linked resource kind during a crawl
+CRAWLER_RESOURCE_CONCURRENCY = {
+    "type": 4,
+    "ability": 8,
+    "species": 8,
+}
+
+# Per-worker cache of rendered pokemon API responses
+RESPONSE_CACHE = {
+    "MAX_ENTRIES": 512,
+    "MAX_BYTES": 16 * 1024 * 1024,
+    "TTL": 300,  # seconds
+    "VERSION_CHECK_INTERVAL": 5,  # seconds between catalogue version checks
+    "RECOMPRESS_WORKERS": 1,  # threads re-compressing cached bodies at the best level
 }
 
+# Memory-mapped base stat matrix used by /stat-search, rebuilt after each crawl that changes data
+STAT_INDEX_PATH = os.environ.get(
+    "STAT_INDEX_PATH", os.path.join(BASE_DIR, "var", "stat_index.npy")
+)
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -94,15 +125,40 @@ WSGI_APPLICATION = "app.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": "postgres",
-        "USER": "postgres",
-        "PASSWORD": "postgres",
-        "HOST": "db",
-        "PORT": 5432,
+        # The app.db_backends engines add health checks for persistent connections.
+        "ENGINE": os.environ.get("DB_ENGINE", "app.db_backends.postgresql"),
+        "NAME": os.environ.get("DB_NAME", "postgres"),
+        "USER": os.environ.get("DB_USER", "postgres"),
+        "PASSWORD": os.environ.get("DB_PASSWORD", "postgres"),
+        "HOST": os.environ.get("DB_HOST", "db"),
+        "PORT": int(os.environ.get("DB_PORT", 5432)),
+        # Keep connections open between requests instead of reconnecting every time.
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        # Ping a reused connection before its first use in each request.
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "true").lower()
+        == "true",
+        # Required when connecting through PgBouncer in transaction pooling mode.
+        "DISABLE_SERVER_SIDE_CURSORS": os.environ.get(
+            "DB_DISABLE_SERVER_SIDE_CURSORS", "false"
+        ).lower()
+        == "true",
     }
 }
 
+# Optional read replica: API reads of pokemons data go here, crawler writes go to default.
+if os.environ.get("DB_REPLICA_HOST") or os.environ.get("DB_REPLICA_NAME"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.environ.get("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),
+        "HOST": os.environ.get("DB_REPLICA_HOST", DATABASES["default"]["HOST"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["app.db_router.PrimaryReplicaRouter"]
+
+# Share the primary's connection with its test mirror, so tests reading through the replica see test data.
+TEST_RUNNER = "app.test_runner.MirroredReplicaTestRunner"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -0,0 +1,20 @@
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+
+class MirroredReplicaTestRunner(DiscoverRunner):
+    """
+    Test runner that makes test mirrors share the connection of the database they mirror.
+
+    By default a mirror opens its own connection, which cannot see the data a ``TestCase``
+    creates inside its transaction. Test cases that read through a mirror must list it in
+    ``databases`` (``"__all__"`` covers it).
+    """
+
+    def setup_databases(self, **kwargs):
+        old_config = super().setup_databases(**kwargs)
+        for alias in connections:
+            mirror_alias = connections[alias].settings_dict["TEST"].get("MIRROR")
+            if mirror_alias:
+                connections[alias] = connections[mirror_alias]
+        return old_config
@@ -1,13 +1,42 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connections
 from django.test import TestCase
+from django.utils import timezone
+from redis.exceptions import LockError
 from requests.exceptions import HTTPError
 from rest_framework.exceptions import APIException
+from unittest import skipUnless
 from unittest.mock import MagicMock, call, patch
 
-from app.management.commands.update_pokemon_data import Command
-from pokemons.models import Pokemon, PokemonAbility, PokemonStats, PokemonType
+from app.crawl_lock import CrawlInProgress, crawl_lock
+from app.db_backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from app.db_router import PrimaryReplicaRouter, use_primary
+from app.management.commands.update_pokemon_data import Command, parse_age
+from app.resource_graph import ResourceGraph, extract_resource_id
+from pokemons.models import (
+    Ability,
+    Pokemon,
+    PokemonAbility,
+    PokemonChange,
+    PokemonStats,
+    PokemonType,
+    Species,
+    Type,
+)
 
 
 class TestUpdatePokemonData(TestCase):
+    databases = "__all__"
+
     @patch("app.management.commands.update_pokemon_data.Command.extract_pokemon_id")
     def test_extract_pokemon_id_with_valid_url(self, mock_extract_pokemon_id):
         url = "https://pokeapi.co/api/v2/pokemon/25/"
@@ -57,7 +86,9 @@ class TestUpdatePokemonData(TestCase):
             "weight": 69,
             "base_experience": 64,
             "abilities": [{"ability": {"name": "overgrow"}, "is_hidden": False}],
-            "types": [{"type": {"name": "grass", "url": "https://pokeapi.co/api/v2/type/12/"}}],
+            "types": [
+                {"type": {"name": "grass", "url": "https://pokeapi.co/api/v2/type/12/"}}
+            ],
             "stats": [{"stat": {"name": "hp"}, "effort": 0, "base_stat": 45}],
         }
         mock_response.json.return_value = mock_pokemon_data
@@ -72,25 +103,280 @@ class TestUpdatePokemonData(TestCase):
         self.assertTrue(PokemonStats.objects.filter(pokemon=pokemon).exists())
         self.assertTrue(PokemonType.objects.filter(pokemon=pokemon).exists())
 
+    @patch("app.management.commands.update_pokemon_data.requests.get")
+    def test_update_or_create_record_records_changes(self, mock_requests_get):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_pokemon_data = {
+            "id": 1,
+            "name": "bulbasaur",
+            "height": 7,
+            "weight": 69,
+            "base_experience": 64,
+            "abilities": [{"ability": {"name": "overgrow"}, "is_hidden": False}],
+            "types": [
+                {"type": {"name": "grass", "url": "https://pokeapi.co/api/v2/type/12/"}}
+            ],
+            "stats": [{"stat": {"name": "hp"}, "effort": 0, "base_stat": 45}],
+        }
+        mock_response.json.return_value = mock_pokemon_data
+        mock_requests_get.return_value = mock_response
+
+        command = Command()
+        command.update_or_create_record(1)
+        Pokemon.objects.update(last_fetched_at=None)
+        command.update_or_create_record(1)
+        self.assertIsNotNone(Pokemon.objects.get(pokemon_id=1).last_fetched_at)
+        mock_pokemon_data["weight"] = 70
+        command.update_or_create_record(1)
+
+        actions = list(
+            PokemonChange.objects.order_by("seq").values_list("action", flat=True)
+        )
+        self.assertEqual(actions, [PokemonChange.CREATED, PokemonChange.UPDATED])
+        self.assertEqual(Pokemon.objects.get(pokemon_id=1).weight, 70)
+
+    def test_delete_missing_records(self):
+        Pokemon.objects.create(pokemon_id=1, pokemon_name="bulbasaur")
+        Pokemon.objects.create(pokemon_id=2, pokemon_name="ivysaur")
+
+        command = Command()
+        command.delete_missing_records(["1"])
+
+        self.assertFalse(Pokemon.objects.filter(pokemon_id=2).exists())
+        change = PokemonChange.objects.get()
+        self.assertEqual(change.pokemon_id, 2)
+        self.assertEqual(change.action, PokemonChange.DELETED)
+
+    def test_sync_records_prunes_stale_child_rows(self):
+        pokemon = Pokemon.objects.create(pokemon_id=1, pokemon_name="bulbasaur")
+        kept = PokemonAbility.objects.create(
+            pokemon=pokemon, ability_name="overgrow", is_hidden=False
+        )
+        PokemonAbility.objects.create(
+            pokemon=pokemon, ability_name="stench", is_hidden=True
+        )
+        PokemonStats.objects.create(
+            pokemon=pokemon, base_stat_name="hp", effort=0, base_stat_num=40
+        )
+
+        command = Command()
+        command.sync_records(
+            [
+                {
+                    "id": 1,
+                    "name": "bulbasaur",
+                    "height": 7,
+                    "weight": 69,
+                    "base_experience": 64,
+                    "abilities": [
+                        {"ability": {"name": "overgrow"}, "is_hidden": False}
+                    ],
+                    "types": [],
+                    "stats": [{"stat": {"name": "hp"}, "effort": 0, "base_stat": 45}],
+                }
+            ]
+        )
+
+        abilities = PokemonAbility.objects.filter(pokemon=pokemon)
+        self.assertEqual(list(abilities.values_list("pk", flat=True)), [kept.pk])
+        self.assertEqual(PokemonStats.objects.get(pokemon=pokemon).base_stat_num, 45)
+        self.assertFalse(PokemonType.objects.filter(pokemon=pokemon).exists())
+
+    def test_sync_records_drops_only_malformed_payloads(self):
+        payloads = [
+            {
+                "id": pokemon_id,
+                "name": name,
+                "height": 7,
+                "weight": 69,
+                "base_experience": 64,
+                "abilities": [],
+                "types": [],
+                "stats": [],
+            }
+            for pokemon_id, name in [(1, "bulbasaur"), (2, "ivysaur")]
+        ]
+        del payloads[1]["base_experience"]
+
+        command = Command()
+        command.sync_records(payloads)
+
+        self.assertTrue(Pokemon.objects.filter(pokemon_id=1).exists())
+        self.assertFalse(Pokemon.objects.filter(pokemon_id=2).exists())
+        self.assertEqual(command.failed_pokemon_ids, [2])
+
+    @patch("app.management.commands.update_pokemon_data.Command.save_records")
+    def test_sync_records_retries_failed_batch_one_at_a_time(self, mock_save_records):
+        def save_records(payloads):
+            if len(payloads) > 1 or payloads[0]["id"] == 2:
+                raise ValueError("bad row")
+
+        mock_save_records.side_effect = save_records
+        payloads = [
+            {
+                "id": pokemon_id,
+                "name": "pokemon",
+                "height": 7,
+                "weight": 69,
+                "base_experience": 64,
+                "abilities": [],
+                "types": [],
+                "stats": [],
+            }
+            for pokemon_id in [1, 2, 3]
+        ]
+
+        command = Command()
+        command.sync_records(payloads)
+
+        self.assertEqual(mock_save_records.call_count, 4)
+        self.assertEqual(command.failed_pokemon_ids, [2])
+
+    @patch("app.management.commands.update_pokemon_data.Command.fetch_resource")
+    def test_sync_records_links_resources(self, mock_fetch_resource):
+        resources = {
+            "https://pokeapi.co/api/v2/type/12/": {
+                "name": "grass",
+                "damage_relations": {
+                    "double_damage_from": [{"name": "fire", "url": "..."}]
+                },
+            },
+            "https://pokeapi.co/api/v2/ability/65/": {
+                "name": "overgrow",
+                "effect_entries": [
+                    {
+                        "effect": "Strengthens grass moves.",
+                        "short_effect": "Grass boost.",
+                        "language": {"name": "en"},
+                    }
+                ],
+            },
+            "https://pokeapi.co/api/v2/pokemon-species/1/": {
+                "name": "bulbasaur",
+                "capture_rate": 45,
+            },
+        }
+        mock_fetch_resource.side_effect = resources.get
+        payloads = [
+            {
+                "id": pokemon_id,
+                "name": name,
+                "height": 7,
+                "weight": 69,
+                "base_experience": 64,
+                "species": {"url": "https://pokeapi.co/api/v2/pokemon-species/1/"},
+                "abilities": [
+                    {
+                        "ability": {
+                            "name": "overgrow",
+                            "url": "https://pokeapi.co/api/v2/ability/65/",
+                        },
+                        "is_hidden": False,
+                    }
+                ],
+                "types": [
+                    {
+                        "type": {
+                            "name": "grass",
+                            "url": "https://pokeapi.co/api/v2/type/12/",
+                        }
+                    }
+                ],
+                "stats": [],
+            }
+            for pokemon_id, name in [(1, "bulbasaur"), (2, "ivysaur")]
+        ]
+
+        command = Command()
+        command.sync_records(payloads)
+        command.close_resource_graph()
+
+        self.assertEqual(mock_fetch_resource.call_count, 3)
+        self.assertEqual(
+            Type.objects.get(type_id=12).damage_relations,
+            {"double_damage_from": ["fire"]},
+        )
+        self.assertEqual(
+            Ability.objects.get(ability_id=65).short_effect, "Grass boost."
+        )
+        self.assertEqual(Species.objects.get(species_id=1).capture_rate, 45)
+        self.assertEqual(PokemonType.objects.filter(type_id=12).count(), 2)
+        self.assertEqual(PokemonAbility.objects.filter(ability_id=65).count(), 2)
+        self.assertEqual(Pokemon.objects.filter(species_id=1).count(), 2)
+
+    @patch("app.management.commands.update_pokemon_data.Command.fetch_resource")
+    def test_sync_records_fills_in_link_after_failed_fetch(self, mock_fetch_resource):
+        payload = {
+            "id": 1,
+            "name": "bulbasaur",
+            "height": 7,
+            "weight": 69,
+            "base_experience": 64,
+            "species": {"url": "https://pokeapi.co/api/v2/pokemon-species/1/"},
+            "abilities": [
+                {
+                    "ability": {
+                        "name": "overgrow",
+                        "url": "https://pokeapi.co/api/v2/ability/65/",
+                    },
+                    "is_hidden": False,
+                }
+            ],
+            "types": [
+                {"type": {"name": "grass", "url": "https://pokeapi.co/api/v2/type/12/"}}
+            ],
+            "stats": [],
+        }
+        resources = {
+            "https://pokeapi.co/api/v2/type/12/": {"name": "grass"},
+            "https://pokeapi.co/api/v2/ability/65/": {"name": "overgrow"},
+            "https://pokeapi.co/api/v2/pokemon-species/1/": {"name": "bulbasaur"},
+        }
+
+        for resources_available in [False, True]:
+            mock_fetch_resource.side_effect = lambda url: (
+                resources.get(url) if resources_available else None
+            )
+            command = Command()
+            command.sync_records([payload])
+            command.close_resource_graph()
+            if not resources_available:
+                self.assertIsNone(PokemonType.objects.get(pokemon_id=1).type_id)
+                content_hash = Pokemon.objects.get(pokemon_id=1).content_hash
+
+        pokemon = Pokemon.objects.get(pokemon_id=1)
+        self.assertEqual(pokemon.species_id, 1)
+        self.assertEqual(pokemon.content_hash, content_hash)
+        self.assertEqual(PokemonAbility.objects.get(pokemon_id=1).ability_id, 65)
+        self.assertEqual(PokemonType.objects.get(pokemon_id=1).type_id, 12)
+        # The served document did not change, so only the creation is recorded.
+        self.assertEqual(
+            list(PokemonChange.objects.values_list("action", flat=True)),
+            [PokemonChange.CREATED],
+        )
+
     @patch("app.management.commands.update_pokemon_data.Command.get_all_pokemon_ids")
-    @patch(
-        "app.management.commands.update_pokemon_data.Command.update_or_create_record"
-    )
+    @patch("app.management.commands.update_pokemon_data.Command.fetch_pokemon_data")
+    @patch("app.management.commands.update_pokemon_data.Command.sync_records")
     def test_update_or_create_all(
-        self, mock_update_or_create_record, mock_get_all_pokemon_ids
+        self, mock_sync_records, mock_fetch_pokemon_data, mock_get_all_pokemon_ids
     ):
         mock_get_all_pokemon_ids.return_value = ["1", "2", "3"]
+        mock_fetch_pokemon_data.side_effect = [{"id": 1}, None, {"id": 3}]
 
         command = Command()
         command.update_or_create_all()
 
-        mock_update_or_create_record.assert_any_call("1")
-        mock_update_or_create_record.assert_any_call("2")
-        mock_update_or_create_record.assert_any_call("3")
+        mock_fetch_pokemon_data.assert_has_calls([call("1"), call("2"), call("3")])
+        mock_sync_records.assert_called_once_with([{"id": 1}, {"id": 3}])
 
+    @patch("app.management.commands.update_pokemon_data.crawl_lock")
     @patch("app.management.commands.update_pokemon_data.Command.update_or_create_all")
     @patch("logging.Logger.info")
-    def test_handle_successful(self, mock_logger_info, mock_update_or_create_all):
+    def test_handle_successful(
+        self, mock_logger_info, mock_update_or_create_all, mock_crawl_lock
+    ):
         command = Command()
         command.handle()
 
@@ -101,3 +387,313 @@ class TestUpdatePokemonData(TestCase):
 
         mock_logger_info.assert_has_calls(expected_calls)
         mock_update_or_create_all.assert_called_once()
+
+    @patch("app.management.commands.update_pokemon_data.crawl_lock")
+    @patch("app.management.commands.update_pokemon_data.Command.update_or_create_all")
+    @patch("logging.Logger.warning")
+    @patch("logging.Logger.info")
+    def test_handle_reports_unsaved_pokemon(
+        self,
+        mock_logger_info,
+        mock_logger_warning,
+        mock_update_or_create_all,
+        mock_crawl_lock,
+    ):
+        command = Command()
+        mock_update_or_create_all.side_effect = lambda limit: (
+            command.failed_pokemon_ids.append(2)
+        )
+        command.handle()
+
+        self.assertNotIn(call("Data update successful."), mock_logger_info.mock_calls)
+        mock_logger_warning.assert_called_with(
+            "Data update finished, 1 Pokemon not saved."
+        )
+
+    @patch("app.management.commands.update_pokemon_data.crawl_lock")
+    @patch("app.management.commands.update_pokemon_data.get_catalogue_version")
+    @patch("app.management.commands.update_pokemon_data.build_stat_index")
+    @patch("app.management.commands.update_pokemon_data.Command.update_or_create_all")
+    @patch("logging.Logger.error")
+    @patch("logging.Logger.info")
+    def test_handle_survives_stat_index_failure(
+        self,
+        mock_logger_info,
+        mock_logger_error,
+        mock_update_or_create_all,
+        mock_build_stat_index,
+        mock_get_catalogue_version,
+        mock_crawl_lock,
+    ):
+        mock_get_catalogue_version.side_effect = [1, 2]
+        mock_build_stat_index.side_effect = OSError("disk full")
+
+        command = Command()
+        command.handle()
+
+        mock_logger_error.assert_called_once_with(
+            "Error rebuilding stat index: disk full"
+        )
+        mock_logger_info.assert_called_with("Data update successful.")
+
+    @patch("app.management.commands.update_pokemon_data.crawl_lock")
+    @patch("app.management.commands.update_pokemon_data.Command.update_or_create_all")
+    def test_handle_skips_when_crawl_in_progress(
+        self, mock_update_or_create_all, mock_crawl_lock
+    ):
+        mock_crawl_lock.return_value.__enter__.side_effect = CrawlInProgress
+
+        command = Command()
+        command.handle()
+
+        mock_update_or_create_all.assert_not_called()
+
+    @patch("app.management.commands.update_pokemon_data.crawl_lock")
+    @patch("app.management.commands.update_pokemon_data.Command.update_or_create_many")
+    def test_handle_with_ids_and_limit(
+        self, mock_update_or_create_many, mock_crawl_lock
+    ):
+        call_command("update_pokemon_data", "--ids", "1,25,150", "--limit", "2")
+
+        mock_update_or_create_many.assert_called_once_with(["1", "25"])
+
+    @patch("app.management.commands.update_pokemon_data.crawl_lock")
+    def test_handle_rejects_invalid_options(self, mock_crawl_lock):
+        with self.assertRaises(CommandError):
+            call_command("update_pokemon_data", "--stale-after", "7d", "--limit", "-1")
+        with self.assertRaises(CommandError):
+            call_command("update_pokemon_data", "--ids", "1", "--stale-after", "7d")
+
+    @patch("app.management.commands.update_pokemon_data.requests.get")
+    def test_update_or_create_many_stamps_only_not_found_pokemon(
+        self, mock_requests_get
+    ):
+        Pokemon.objects.create(pokemon_id=1, pokemon_name="bulbasaur")
+        Pokemon.objects.create(pokemon_id=2, pokemon_name="ivysaur")
+        mock_requests_get.side_effect = lambda url: MagicMock(
+            status_code=404 if url.endswith("/1") else 503
+        )
+
+        command = Command()
+        command.update_or_create_many(["1", "2"])
+
+        self.assertIsNotNone(Pokemon.objects.get(pokemon_id=1).last_fetched_at)
+        self.assertEqual(command.get_stale_pokemon_ids(timedelta(days=1)), [2])
+
+    def test_get_stale_pokemon_ids(self):
+        now = timezone.now()
+        Pokemon.objects.create(
+            pokemon_id=1, pokemon_name="bulbasaur", last_fetched_at=now
+        )
+        Pokemon.objects.create(
+            pokemon_id=2,
+            pokemon_name="ivysaur",
+            last_fetched_at=now - timedelta(days=8),
+        )
+        Pokemon.objects.create(pokemon_id=3, pokemon_name="venusaur")
+
+        command = Command()
+
+        self.assertEqual(command.get_stale_pokemon_ids(timedelta(days=7)), [3, 2])
+        self.assertEqual(command.get_stale_pokemon_ids(timedelta(days=7), 1), [3])
+
+    def test_parse_age(self):
+        self.assertEqual(parse_age("7d"), timedelta(days=7))
+        self.assertEqual(parse_age("12h"), timedelta(hours=12))
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parse_age("7 days")
+
+
+@patch("app.crawl_lock.redis.Redis.from_url")
+class TestCrawlLock(TestCase):
+    databases = "__all__"
+
+    def test_acquires_and_releases_lock(self, mock_from_url):
+        lock = mock_from_url.return_value.lock.return_value
+        lock.acquire.return_value = True
+
+        with crawl_lock("test-lock"):
+            lock.release.assert_not_called()
+
+        mock_from_url.return_value.lock.assert_called_once_with(
+            "test-lock", timeout=settings.CRAWL_LOCK_TIMEOUT, blocking=False
+        )
+        lock.release.assert_called_once()
+
+    def test_raises_when_lock_is_held(self, mock_from_url):
+        lock = mock_from_url.return_value.lock.return_value
+        lock.acquire.return_value = False
+
+        with self.assertRaises(CrawlInProgress):
+            with crawl_lock():
+                self.fail("Crawl ran without the lock")
+
+        lock.release.assert_not_called()
+
+    @patch("logging.Logger.warning")
+    def test_lock_expired_before_release(self, mock_logger_warning, mock_from_url):
+        lock = mock_from_url.return_value.lock.return_value
+        lock.acquire.return_value = True
+        lock.release.side_effect = LockError("Cannot release an unlocked lock")
+
+        with crawl_lock():
+            pass
+
+        mock_logger_warning.assert_called_once_with(
+            "Crawl lock expired before the crawl finished"
+        )
+
+
+class TestPrimaryReplicaRouter(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    @patch.dict("django.conf.settings.DATABASES", {"default": {}}, clear=True)
+    def test_reads_use_primary_without_replica(self):
+        self.assertEqual(self.router.db_for_read(Pokemon), "default")
+
+    @patch.dict("django.conf.settings.DATABASES", {"replica": {}})
+    def test_reads_use_replica_when_configured(self):
+        self.assertEqual(self.router.db_for_read(Pokemon), "replica")
+        self.assertEqual(self.router.db_for_write(Pokemon), "default")
+
+    @patch.dict("django.conf.settings.DATABASES", {"replica": {}})
+    def test_use_primary_pins_reads(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Pokemon), "default")
+        self.assertEqual(self.router.db_for_read(Pokemon), "replica")
+
+    @skipUnless("replica" in settings.DATABASES, "No replica database configured")
+    def test_reads_and_writes_through_both_aliases(self):
+        written = Pokemon.objects.create(pokemon_id=1, pokemon_name="bulbasaur")
+        self.assertEqual(written._state.db, "default")
+
+        read = Pokemon.objects.get(pokemon_id=1)
+        self.assertEqual(read._state.db, "replica")
+
+        read.weight = 69
+        read.save()
+        with use_primary():
+            primary_read = Pokemon.objects.get(pokemon_id=1)
+        self.assertEqual(primary_read._state.db, "default")
+        self.assertEqual(primary_read.weight, 69)
+
+
+class TestConnectionHealthChecks(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        # SQLite never closes in-memory databases, so use a file.
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.wrapper = SQLiteDatabaseWrapper(
+            {
+                **connections["default"].settings_dict,
+                "NAME": os.path.join(tmp_dir.name, "health-check.sqlite3"),
+                "CONN_MAX_AGE": 60,
+                "CONN_HEALTH_CHECKS": True,
+            },
+            "health-check",
+        )
+        self.addCleanup(self.wrapper.close)
+
+    def start_request(self):
+        self.wrapper.close_if_unusable_or_obsolete()
+
+    def test_new_connection_not_checked(self):
+        with patch.object(self.wrapper, "is_usable") as mock_is_usable:
+            self.wrapper.cursor()
+            self.wrapper.cursor()
+
+        mock_is_usable.assert_not_called()
+
+    def test_reused_connection_checked_once_per_request(self):
+        self.wrapper.cursor()
+        connection = self.wrapper.connection
+        self.start_request()
+
+        with patch.object(
+            self.wrapper, "is_usable", return_value=True
+        ) as mock_is_usable:
+            self.wrapper.cursor()
+            self.wrapper.cursor()
+
+        mock_is_usable.assert_called_once()
+        self.assertIs(self.wrapper.connection, connection)
+
+    def test_dropped_connection_replaced_before_use(self):
+        self.wrapper.cursor()
+        connection = self.wrapper.connection
+        self.start_request()
+
+        with patch.object(self.wrapper, "is_usable", return_value=False):
+            with self.wrapper.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+        self.assertIsNot(self.wrapper.connection, connection)
+
+    def test_unused_connection_not_checked(self):
+        self.wrapper.cursor()
+        self.start_request()
+
+        with patch.object(self.wrapper, "is_usable") as mock_is_usable:
+            self.start_request()
+
+        mock_is_usable.assert_not_called()
+
+
+class TestResourceGraph(TestCase):
+    databases = "__all__"
+
+    def test_extract_resource_id(self):
+        self.assertEqual(extract_resource_id("https://pokeapi.co/api/v2/type/12/"), 12)
+        self.assertIsNone(extract_resource_id("https://pokeapi.co/api/v2/type/"))
+        self.assertIsNone(extract_resource_id(None))
+
+    def test_fetches_each_url_once(self):
+        fetch = MagicMock(side_effect=lambda url: {"url": url})
+        graph = ResourceGraph(fetch, {"type": 2})
+
+        fetched = graph.resolve("type", ["a", "b", "a"])
+        graph.close()
+
+        self.assertEqual(fetched, {"a": {"url": "a"}, "b": {"url": "b"}})
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_keeps_only_failed_fetches(self):
+        fetch = MagicMock(side_effect=lambda url: None if url == "a" else {"url": url})
+        graph = ResourceGraph(fetch, {"type": 2})
+
+        graph.resolve("type", ["a", "b"])
+        fetched = graph.resolve("type", ["a"])
+        graph.close()
+
+        self.assertEqual(fetched, {"a": None})
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(list(graph._futures), ["a"])
+
+    def test_limits_concurrent_fetches_per_kind(self):
+        running = {"type": 0, "species": 0}
+        peak = {"type": 0, "species": 0}
+        lock = threading.Lock()
+
+        def fetch(url):
+            kind = url.split("/")[0]
+            with lock:
+                running[kind] += 1
+                peak[kind] = max(peak[kind], running[kind])
+            time.sleep(0.02)
+            with lock:
+                running[kind] -= 1
+            return {"url": url}
+
+        graph = ResourceGraph(fetch, {"type": 2, "species": 4})
+        with ThreadPoolExecutor(max_workers=2) as callers:
+            callers.submit(graph.resolve, "type", [f"type/{i}" for i in range(8)])
+            callers.submit(graph.resolve, "species", [f"species/{i}" for i in range(8)])
+        graph.close()
+
+        self.assertLessEqual(peak["type"], 2)
+        self.assertLessEqual(peak["species"], 4)
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pokemons", "0003_pokemon_change_feed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Ability",
+            fields=[
+                ("ability_id", models.IntegerField(primary_key=True, serialize=False)),
+                ("ability_name", models.CharField(max_length=50)),
+                ("effect", models.TextField(null=True)),
+                ("short_effect", models.TextField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Species",
+            fields=[
+                ("species_id", models.IntegerField(primary_key=True, serialize=False)),
+                ("species_name", models.CharField(max_length=50)),
+                ("capture_rate", models.IntegerField(null=True)),
+                ("base_happiness", models.IntegerField(null=True)),
+                ("is_legendary", models.BooleanField(null=True)),
+                ("is_mythical", models.BooleanField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Type",
+            fields=[
+                ("type_id", models.IntegerField(primary_key=True, serialize=False)),
+                ("type_name", models.CharField(max_length=50)),
+                ("damage_relations", models.JSONField(null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="pokemon",
+            name="species",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="pokemons",
+                to="pokemons.species",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pokemonability",
+            name="ability",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="pokemon_abilities",
+                to="pokemons.ability",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pokemontype",
+            name="type",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="pokemon_types",
+                to="pokemons.type",
+            ),
+        ),
+    ]
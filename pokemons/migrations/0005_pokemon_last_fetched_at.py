@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pokemons", "0004_linked_resources"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pokemon",
+            name="last_fetched_at",
+            field=models.DateTimeField(db_index=True, null=True),
+        ),
+    ]
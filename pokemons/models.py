@@ -2,12 +2,45 @@ from django.db import models
 
 
 # Create your models here.
+class Type(models.Model):
+    type_id = models.IntegerField(primary_key=True)
+    type_name = models.CharField(max_length=50)
+    damage_relations = models.JSONField(null=True)
+
+    objects = models.Manager()
+
+
+class Ability(models.Model):
+    ability_id = models.IntegerField(primary_key=True)
+    ability_name = models.CharField(max_length=50)
+    effect = models.TextField(null=True)
+    short_effect = models.TextField(null=True)
+
+    objects = models.Manager()
+
+
+class Species(models.Model):
+    species_id = models.IntegerField(primary_key=True)
+    species_name = models.CharField(max_length=50)
+    capture_rate = models.IntegerField(null=True)
+    base_happiness = models.IntegerField(null=True)
+    is_legendary = models.BooleanField(null=True)
+    is_mythical = models.BooleanField(null=True)
+
+    objects = models.Manager()
+
+
 class Pokemon(models.Model):
     pokemon_id = models.IntegerField(primary_key=True)
     pokemon_name = models.CharField(max_length=50)
     height = models.IntegerField(null=True)
     weight = models.IntegerField(null=True)
     base_experience = models.IntegerField(null=True)
+    content_hash = models.CharField(max_length=64, null=True)
+    last_fetched_at = models.DateTimeField(null=True, db_index=True)
+    species = models.ForeignKey(
+        Species, related_name="pokemons", null=True, on_delete=models.SET_NULL
+    )
 
     objects = models.Manager()
 
@@ -15,6 +48,9 @@ class Pokemon(models.Model):
 class PokemonAbility(models.Model):
     ability_name = models.CharField(max_length=50, null=True)
     is_hidden = models.BooleanField(null=True)
+    ability = models.ForeignKey(
+        Ability, related_name="pokemon_abilities", null=True, on_delete=models.SET_NULL
+    )
     pokemon = models.ForeignKey(
         Pokemon, related_name="abilities", on_delete=models.CASCADE
     )
@@ -25,6 +61,9 @@ class PokemonAbility(models.Model):
 class PokemonType(models.Model):
     type_name = models.CharField(max_length=50, null=True)
     type_url = models.CharField(max_length=100, null=True)
+    type = models.ForeignKey(
+        Type, related_name="pokemon_types", null=True, on_delete=models.SET_NULL
+    )
     pokemon = models.ForeignKey(Pokemon, related_name="types", on_delete=models.CASCADE)
 
     objects = models.Manager()
@@ -37,3 +76,26 @@ class PokemonStats(models.Model):
     pokemon = models.ForeignKey(Pokemon, related_name="stats", on_delete=models.CASCADE)
 
     objects = models.Manager()
+
+
+class PokemonChange(models.Model):
+    """
+    Append-only change log written by the crawler. ``seq`` is the cursor
+    handed to downstream consumers of the ``/changes`` feed.
+    """
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    ACTION_CHOICES = [
+        (CREATED, "Created"),
+        (UPDATED, "Updated"),
+        (DELETED, "Deleted"),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    pokemon_id = models.IntegerField(db_index=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    objects = models.Manager()
@@ -0,0 +1,277 @@
+import brotli
+import gzip
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db.models import Max
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from .models import PokemonChange
+
+# Bodies shorter than this are not worth compressing
+MIN_COMPRESS_LENGTH = 200
+# Compressed encodings, in order of preference when the client accepts several equally
+ENCODING_PREFERENCE = ("br", "gzip")
+# Compression levels used while filling the cache on a request, which must stay fast
+FILL_LEVELS = {"gzip": 6, "br": 5}
+# Compression levels used when re-compressing cached bodies in the background
+BEST_LEVELS = {"gzip": 9, "br": 11}
+
+
+def compress_variants(content, levels=FILL_LEVELS) -> Dict[str, bytes]:
+    """
+    Compress a response body once with every supported encoding.
+
+    Parameters:
+        content (bytes): The response body.
+        levels (dict): The compression level to use per content coding.
+
+    Returns:
+        A mapping of content coding to body. ``identity`` is always present; a compressed
+        variant is only kept if it is smaller.
+    """
+    variants = {"identity": content}
+    if len(content) < MIN_COMPRESS_LENGTH:
+        return variants
+
+    compressed = {
+        "gzip": gzip.compress(content, compresslevel=levels["gzip"], mtime=0),
+        "br": brotli.compress(content, quality=levels["br"]),
+    }
+    for encoding, body in compressed.items():
+        if len(body) < len(content):
+            variants[encoding] = body
+    return variants
+
+
+def choose_encoding(accept_encoding, variants) -> str:
+    """
+    Pick the variant to send for an ``Accept-Encoding`` header.
+
+    Parameters:
+        accept_encoding (str): The request's Accept-Encoding header value.
+        variants (dict): The available variants, as returned by ``compress_variants``.
+
+    Returns:
+        str: The chosen content coding, ``identity`` if no compressed variant is acceptable.
+    """
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+
+    best_encoding, best_quality = "identity", 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding in variants:
+            quality = qualities.get(encoding, qualities.get("*", 0.0))
+            if quality > best_quality:
+                best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+def get_catalogue_version() -> Optional[int]:
+    """
+    Return the sequence number of the latest crawler change, which identifies the catalogue version.
+    """
+    return PokemonChange.objects.aggregate(Max("seq"))["seq__max"]
+
+
+class CacheEntry(NamedTuple):
+    variants: Dict[str, bytes]
+    content_type: str
+    expires_at: float
+    # Whether the compressed variants are already at BEST_LEVELS
+    best: bool
+
+
+class LRUResponseCache:
+    """
+    Bounded, thread-safe, in-process LRU of rendered response bodies and their compressed variants.
+
+    Entries expire after ``ttl`` seconds, and the least recently used entries are evicted
+    once either ``max_entries`` or ``max_bytes`` is exceeded. Every entry is invalidated
+    when the catalogue version changes; the version is polled at most once every
+    ``version_check_interval`` seconds. Expired and invalidated entries are no longer
+    served, but are kept until evicted so that refilling a key with an unchanged body
+    reuses its compressed variants.
+
+    With ``recompress_workers``, compressed variants stored at ``FILL_LEVELS`` are
+    re-compressed at ``BEST_LEVELS`` by background threads, so later hits get the smaller
+    bodies without the request that filled the entry paying for it. Each body is
+    re-compressed at most once, with at most one pending job per key.
+    """
+
+    def __init__(
+        self,
+        max_entries,
+        max_bytes,
+        ttl,
+        version_check_interval,
+        get_version: Callable[[], Optional[int]] = get_catalogue_version,
+        recompress_workers=0,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self._get_version = get_version
+        self._entries = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = None
+        self._recompressor = (
+            ThreadPoolExecutor(recompress_workers, thread_name_prefix="response-cache")
+            if recompress_workers
+            else None
+        )
+        self.clear()
+
+    def get(self, key) -> Optional[Tuple[Dict[str, bytes], str]]:
+        """
+        Return the cached ``(variants, content_type)`` for a key, or None on a miss.
+        """
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.variants, entry.content_type
+
+    def set(self, key, content, content_type) -> Dict[str, bytes]:
+        """
+        Cache a response body and return its variants, as returned by ``compress_variants``.
+
+        The body is compressed at ``FILL_LEVELS``, unless the key's expired or invalidated
+        entry holds the same body, in which case its variants are reused.
+        """
+        self._check_version()
+        with self._lock:
+            previous = self._entries.get(key)
+        if previous is not None and previous.variants["identity"] == content:
+            variants, best = previous.variants, previous.best
+        else:
+            variants, best = compress_variants(content), False
+
+        size = sum(len(body) for body in variants.values())
+        if size > self.max_bytes:
+            return variants
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(
+                variants, content_type, time.monotonic() + self.ttl, best
+            )
+            self.bytes += size
+
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            recompress = (
+                self._recompressor is not None
+                and not best
+                and len(variants) > 1
+                and key not in self._pending
+            )
+            if recompress:
+                self._pending.add(key)
+
+        if recompress:
+            self._recompressor.submit(self._recompress, key)
+        return variants
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "pending_recompressions": len(self._pending),
+                "catalogue_version": self._version,
+            }
+
+    def _remove(self, key) -> None:
+        variants = self._entries.pop(key).variants
+        self.bytes -= sum(len(body) for body in variants.values())
+
+    def _recompress(self, key) -> None:
+        with self._lock:
+            self._pending.discard(key)
+            entry = self._entries.get(key)
+            # Skip entries that were evicted or already re-compressed.
+            if entry is None or entry.best:
+                return
+
+        variants = entry.variants
+        best = compress_variants(variants["identity"], BEST_LEVELS)
+        with self._lock:
+            current = self._entries.get(key)
+            # Skip entries that were replaced or evicted in the meantime.
+            if current is None or current.variants is not variants:
+                return
+            saved = sum(len(body) for body in variants.values()) - sum(
+                len(body) for body in best.values()
+            )
+            if saved < 0:
+                best, saved = variants, 0
+            self._entries[key] = current._replace(variants=best, best=True)
+            self.bytes -= saved
+
+    def _check_version(self) -> None:
+        now = time.monotonic()
+        if (
+            self._version_checked_at is not None
+            and now - self._version_checked_at < self.version_check_interval
+        ):
+            return
+
+        self._version_checked_at = now
+        version = self._get_version()
+        if version != self._version:
+            with self._lock:
+                for key in list(self._entries):
+                    self._entries[key] = self._entries[key]._replace(expires_at=0)
+                self._version = version
+
+
+response_cache = LRUResponseCache(
+    max_entries=settings.RESPONSE_CACHE["MAX_ENTRIES"],
+    max_bytes=settings.RESPONSE_CACHE["MAX_BYTES"],
+    ttl=settings.RESPONSE_CACHE["TTL"],
+    version_check_interval=settings.RESPONSE_CACHE["VERSION_CHECK_INTERVAL"],
+    recompress_workers=settings.RESPONSE_CACHE["RECOMPRESS_WORKERS"],
+)
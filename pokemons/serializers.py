@@ -1,35 +1,65 @@
 from collections import OrderedDict
+from django.db.models import Prefetch
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from typing import List
 from .models import Pokemon, PokemonAbility, PokemonType, PokemonStats
 
 
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that takes an optional ``fields`` argument listing the fields to keep.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
 class PokemonNameSerializer(serializers.Serializer):
     pokemon_name = serializers.CharField()
 
 
-class PokemonAbilitySerializer(serializers.ModelSerializer):
+class PokemonAbilitySerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = PokemonAbility
         fields = ["ability_name", "is_hidden"]
 
 
-class PokemonTypeSerializer(serializers.ModelSerializer):
+class PokemonTypeSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = PokemonType
         fields = ["type_name", "type_url"]
 
 
-class PokemonStatsSerializer(serializers.ModelSerializer):
+class PokemonStatsSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = PokemonStats
         fields = ["base_stat_name", "effort", "base_stat_num"]
 
 
-class PokemonSerializer(serializers.ModelSerializer):
+class PokemonSerializer(DynamicFieldsModelSerializer):
+    """
+    Serializer for Pokemon documents.
+
+    Takes an optional ``selection`` argument, as returned by ``parse_field_selection``,
+    mapping each field to keep to None (the whole field) or the list of its subfields to keep.
+    """
+
     abilities = PokemonAbilitySerializer(many=True)
     types = PokemonTypeSerializer(many=True)
     stats = PokemonStatsSerializer(many=True)
 
+    relation_serializers = {
+        "abilities": PokemonAbilitySerializer,
+        "types": PokemonTypeSerializer,
+        "stats": PokemonStatsSerializer,
+    }
+
     class Meta:
         model = Pokemon
         fields = [
@@ -43,18 +73,118 @@ class PokemonSerializer(serializers.ModelSerializer):
             "stats",
         ]
 
+    def __init__(self, *args, **kwargs):
+        selection = kwargs.pop("selection", None)
+        if selection is not None:
+            kwargs["fields"] = list(selection)
+        super().__init__(*args, **kwargs)
+
+        for relation, subfields in (selection or {}).items():
+            if relation in self.relation_serializers and subfields is not None:
+                self.fields[relation] = self.relation_serializers[relation](
+                    many=True, fields=subfields
+                )
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
         ordered_data = OrderedDict(
-            [
-                ("pokemon_id", data["pokemon_id"]),
-                ("pokemon_name", data["pokemon_name"]),
-                ("height", data["height"]),
-                ("weight", data["weight"]),
-                ("base_experience", data["base_experience"]),
-                ("abilities", data["abilities"]),
-                ("types", data["types"]),
-                ("stats", data["stats"]),
-            ]
+            (field_name, data[field_name])
+            for field_name in self.Meta.fields
+            if field_name in data
         )
         return ordered_data
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, selection=None):
+        """
+        Restrict a Pokemon queryset to what the selection needs.
+
+        Unselected columns are deferred, and only the selected relations are prefetched.
+        """
+        if selection is None:
+            return queryset.prefetch_related(*cls.relation_serializers)
+
+        columns = [
+            field_name
+            for field_name in selection
+            if field_name not in cls.relation_serializers
+        ]
+        queryset = queryset.only("pokemon_id", *columns)
+
+        for relation, subfields in selection.items():
+            if relation not in cls.relation_serializers:
+                continue
+            related_model = cls.relation_serializers[relation].Meta.model
+            related_queryset = related_model.objects.all()
+            if subfields is not None:
+                related_queryset = related_queryset.only("id", "pokemon_id", *subfields)
+            queryset = queryset.prefetch_related(
+                Prefetch(relation, queryset=related_queryset)
+            )
+        return queryset
+
+
+def parse_field_selection(query_params):
+    """
+    Parse the ``fields`` and ``include`` query parameters into a Pokemon field selection.
+
+    ``fields`` lists the fields to return; ``types.type_name`` style entries keep a single
+    subfield of a relation. ``include`` lists relations to embed. With ``include`` alone,
+    every column is returned along with the included relations.
+
+    Parameters:
+        query_params (QueryDict): The request query parameters.
+
+    Returns:
+        A mapping of field name to None or a list of subfields, or None if neither
+        parameter was given. Empty parameters count as not given.
+
+    Raises:
+        ValidationError: If an unknown field or relation is requested.
+    """
+    fields = split_param(query_params.get("fields"))
+    includes = split_param(query_params.get("include"))
+    if not fields and not includes:
+        return None
+
+    relations = PokemonSerializer.relation_serializers
+    selection = {}
+
+    if not fields:
+        for field_name in PokemonSerializer.Meta.fields:
+            if field_name not in relations:
+                selection[field_name] = None
+
+    for item in fields:
+        field_name, _, subfield = item.partition(".")
+        if field_name not in PokemonSerializer.Meta.fields:
+            raise ValidationError({"fields": f"Unknown field: {field_name}."})
+        if not subfield:
+            selection[field_name] = None
+            continue
+
+        if (
+            field_name not in relations
+            or subfield not in relations[field_name].Meta.fields
+        ):
+            raise ValidationError({"fields": f"Unknown field: {item}."})
+        if field_name not in selection:
+            selection[field_name] = []
+        if selection[field_name] is not None and subfield not in selection[field_name]:
+            selection[field_name].append(subfield)
+
+    for relation in includes:
+        if relation not in relations:
+            raise ValidationError({"include": f"Unknown relation: {relation}."})
+        selection.setdefault(relation, None)
+
+    return selection
+
+
+def split_param(value) -> List[str]:
+    """
+    Split a comma-separated query parameter into its non-empty, stripped items.
+    """
+    return [
+        item for item in (item.strip() for item in (value or "").split(",")) if item
+    ]
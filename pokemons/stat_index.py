@@ -0,0 +1,187 @@
+import numpy as np
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from typing import Dict, List, Optional, Tuple
+
+from .models import PokemonStats
+
+STAT_NAMES = [
+    "hp",
+    "attack",
+    "defense",
+    "special-attack",
+    "special-defense",
+    "speed",
+]
+METRICS = ("euclidean", "cosine")
+# One record per Pokemon. Stats are stored as float32 so searches compute directly on the mapped pages.
+INDEX_DTYPE = np.dtype(
+    [("pokemon_id", np.int32), ("stats", np.float32, (len(STAT_NAMES),))]
+)
+
+
+class StatIndexUnavailable(Exception):
+    """Raised when the stat index file has not been built yet, or must be rebuilt."""
+
+
+def build_stat_index(path=None) -> int:
+    """
+    Write the records built from ``PokemonStats`` to a ``.npy`` file.
+
+    Each ``INDEX_DTYPE`` record holds the pokemon ID and its base stats in ``STAT_NAMES``
+    order, with records sorted by pokemon ID. The file is replaced atomically, so workers
+    that have the previous version memory-mapped keep reading it until they reload.
+
+    Parameters:
+        path (str): Where to write the index. Defaults to ``STAT_INDEX_PATH``.
+
+    Returns:
+        int: The number of Pokemon in the index.
+    """
+    path = str(path or settings.STAT_INDEX_PATH)
+    columns = {stat_name: column for column, stat_name in enumerate(STAT_NAMES)}
+    rows = PokemonStats.objects.filter(base_stat_name__in=columns).values_list(
+        "pokemon_id", "base_stat_name", "base_stat_num"
+    )
+
+    stats_by_pokemon = {}
+    for pokemon_id, stat_name, base_stat_num in rows:
+        stats_by_pokemon.setdefault(pokemon_id, {})[stat_name] = base_stat_num or 0
+
+    index = np.zeros(len(stats_by_pokemon), dtype=INDEX_DTYPE)
+    for row, pokemon_id in enumerate(sorted(stats_by_pokemon)):
+        index[row]["pokemon_id"] = pokemon_id
+        for stat_name, base_stat_num in stats_by_pokemon[pokemon_id].items():
+            index[row]["stats"][columns[stat_name]] = base_stat_num
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npy")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            np.save(tmp_file, index)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(index)
+
+
+def stat_list(row) -> List[int]:
+    return [int(value) for value in row]
+
+
+class StatIndex:
+    """
+    Memory-mapped view of the stat index file, reloaded whenever the file is replaced.
+    """
+
+    def __init__(self, path=None) -> None:
+        self.path = str(path or settings.STAT_INDEX_PATH)
+        self._index = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def load(self) -> np.ndarray:
+        """
+        Return the index records.
+
+        The index is built by the crawler or the ``build_stat_index`` command, never here.
+
+        Raises:
+            StatIndexUnavailable: If the index file does not exist or was written in an older format.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            raise StatIndexUnavailable(self.path)
+
+        with self._lock:
+            if mtime != self._mtime:
+                index = np.load(self.path, mmap_mode="r")
+                if index.dtype != INDEX_DTYPE:
+                    raise StatIndexUnavailable(self.path)
+                self._index = index
+                self._mtime = mtime
+            return self._index
+
+    def search(
+        self,
+        like_id=None,
+        k=10,
+        metric="euclidean",
+        bounds: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+    ) -> List[Tuple[int, Optional[float], List[int]]]:
+        """
+        Find Pokemon whose base stats fall within ``bounds``, nearest to ``like_id`` first.
+
+        Parameters:
+            like_id (int): The reference pokemon ID. Without it, matches are returned in pokemon ID order.
+            k (int): The maximum number of results.
+            metric (str): ``"euclidean"`` or ``"cosine"`` distance.
+            bounds (dict): Inclusive ``(min, max)`` per stat name; either end may be None.
+
+        Returns:
+            A list of ``(pokemon_id, distance, stats)`` tuples. ``distance`` is None without ``like_id``.
+
+        Raises:
+            KeyError: If ``like_id`` is not in the index.
+            StatIndexUnavailable: If the index has not been built.
+        """
+        index = self.load()
+        # Field views of the memory map; only the rows selected below are copied.
+        ids = index["pokemon_id"]
+        stats = index["stats"]
+
+        mask = np.ones(len(ids), dtype=bool)
+        for stat_name, (low, high) in (bounds or {}).items():
+            column = stats[:, STAT_NAMES.index(stat_name)]
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+
+        if like_id is None:
+            candidates = np.flatnonzero(mask)[:k]
+            return [(int(ids[row]), None, stat_list(stats[row])) for row in candidates]
+
+        target_row = int(np.searchsorted(ids, like_id))
+        if target_row >= len(ids) or ids[target_row] != like_id:
+            raise KeyError(like_id)
+        mask[target_row] = False
+
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+
+        target = stats[target_row]
+        candidate_stats = stats[candidates]
+        if metric == "cosine":
+            norms = np.linalg.norm(candidate_stats, axis=1) * np.linalg.norm(target)
+            similarity = np.divide(
+                candidate_stats @ target,
+                norms,
+                out=np.zeros(len(candidates), dtype=np.float32),
+                where=norms > 0,
+            )
+            distances = 1 - similarity
+        else:
+            distances = np.linalg.norm(candidate_stats - target, axis=1)
+
+        k = min(k, len(candidates))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return [
+            (
+                int(ids[candidates[i]]),
+                round(float(distances[i]), 6),
+                stat_list(candidate_stats[i]),
+            )
+            for i in nearest
+        ]
+
+
+stat_index = StatIndex()
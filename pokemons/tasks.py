@@ -3,8 +3,10 @@ from celery import shared_task
 
 
 @shared_task
-def update_pokemon_data():
+def update_pokemon_data(*args):
     """
     Celery task to update or create Pokemon records using data from the PokeAPI.
+
+    Any arguments are passed to the command, e.g. ("--stale-after", "7d", "--limit", "100").
     """
-    call_command("update_pokemon_data")
+    call_command("update_pokemon_data", *args)
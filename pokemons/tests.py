@@ -1,22 +1,58 @@
+import brotli
+import gzip
+import json
+import numpy as np
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
-from rest_framework.test import APIClient
-from unittest.mock import patch
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from unittest.mock import MagicMock, patch
+from .response_cache import (
+    LRUResponseCache,
+    choose_encoding,
+    compress_variants,
+    response_cache,
+)
+from .stat_index import (
+    STAT_NAMES,
+    StatIndex,
+    StatIndexUnavailable,
+    build_stat_index,
+)
+from .serializers import parse_field_selection
 from .views import (
     GetAllPokemonsView,
 )
-from pokemons.models import Pokemon, PokemonAbility, PokemonStats, PokemonType
+from pokemons.models import (
+    Pokemon,
+    PokemonAbility,
+    PokemonChange,
+    PokemonStats,
+    PokemonType,
+)
 
 
+POKEMON_NAMES_BODY = json.dumps(
+    {"pokemon_names": [f"pokemon-{i}-{'x' * (i % 7)}" for i in range(300)]}
+).encode()
+
 ## UNIT TESTS
 
 
 class TestGetAllPokemonsView(TestCase):
+    databases = "__all__"
+
     @patch("pokemons.views.Pokemon.objects.values_list")
     def test_get_returns_sorted_pokemon_names(self, mock_values_list):
         mock_values_list.return_value = ["Bulbasaur", "Pikachu", "Ditto", "Charmander"]
         view = GetAllPokemonsView()
-        response = view.get(None)
+        response = view.get(Request(APIRequestFactory().get("/all-pokemons")))
         expected_data = {
             "pokemon_names": ["Bulbasaur", "Charmander", "Ditto", "Pikachu"]
         }
@@ -29,8 +65,221 @@ class TestGetAllPokemonsView(TestCase):
 ## INTEGRATION TESTS
 
 
+class TestLRUResponseCache(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.version = 1
+        self.cache = LRUResponseCache(
+            max_entries=2,
+            max_bytes=10,
+            ttl=60,
+            version_check_interval=0,
+            get_version=lambda: self.version,
+        )
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", b"1", "application/json")
+        self.cache.set("b", b"2", "application/json")
+        self.cache.get("a")
+        self.cache.set("c", b"3", "application/json")
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), ({"identity": b"1"}, "application/json"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_evicts_to_stay_under_max_bytes(self):
+        self.cache.set("a", b"123456", "application/json")
+        self.cache.set("b", b"123456", "application/json")
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["bytes"], 6)
+
+    @patch("pokemons.response_cache.time.monotonic")
+    def test_expires_entries(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        self.cache.set("a", b"1", "application/json")
+
+        mock_monotonic.return_value = 161
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_compress_variants(self):
+        content = b'{"pokemon_names": ["bulbasaur"]}' * 20
+        variants = compress_variants(content)
+
+        self.assertEqual(gzip.decompress(variants["gzip"]), content)
+        self.assertEqual(brotli.decompress(variants["br"]), content)
+        self.assertEqual(compress_variants(b"{}"), {"identity": b"{}"})
+
+    def recompressing_cache(self):
+        cache = LRUResponseCache(
+            max_entries=2,
+            max_bytes=1024 * 1024,
+            ttl=60,
+            version_check_interval=0,
+            get_version=lambda: self.version,
+            recompress_workers=1,
+        )
+        cache._recompressor = MagicMock()
+        return cache
+
+    def test_recompresses_cached_bodies_at_best_level(self):
+        cache = self.recompressing_cache()
+        cache.set("a", POKEMON_NAMES_BODY, "application/json")
+        cache.set("a", POKEMON_NAMES_BODY + b" ", "application/json")
+
+        cache._recompressor.submit.assert_called_once_with(cache._recompress, "a")
+        cache._recompress("a")
+
+        variants = cache.get("a")[0]
+        self.assertEqual(
+            variants["br"], brotli.compress(POKEMON_NAMES_BODY + b" ", quality=11)
+        )
+        self.assertEqual(
+            cache.stats()["bytes"], sum(len(body) for body in variants.values())
+        )
+        self.assertEqual(cache.stats()["pending_recompressions"], 0)
+
+    def test_unchanged_body_not_compressed_again(self):
+        cache = self.recompressing_cache()
+        cache.set("a", POKEMON_NAMES_BODY, "application/json")
+        cache._recompress("a")
+        best = cache.get("a")[0]
+        self.version = 2
+
+        with patch("pokemons.response_cache.compress_variants") as mock_compress:
+            self.assertIsNone(cache.get("a"))
+            variants = cache.set("a", POKEMON_NAMES_BODY, "application/json")
+
+        mock_compress.assert_not_called()
+        self.assertIs(variants, best)
+        cache._recompressor.submit.assert_called_once()
+
+    def test_recompress_skips_evicted_entries(self):
+        cache = self.recompressing_cache()
+        cache.set("a", POKEMON_NAMES_BODY, "application/json")
+        cache.set("b", POKEMON_NAMES_BODY, "application/json")
+        cache.set("c", POKEMON_NAMES_BODY, "application/json")
+
+        with patch("pokemons.response_cache.compress_variants") as mock_compress:
+            cache._recompress("a")
+
+        mock_compress.assert_not_called()
+
+    def test_choose_encoding(self):
+        variants = {"identity": b"", "gzip": b"", "br": b""}
+
+        self.assertEqual(choose_encoding("gzip, deflate, br", variants), "br")
+        self.assertEqual(choose_encoding("br;q=0.5, gzip", variants), "gzip")
+        self.assertEqual(choose_encoding("br;q=0, *", variants), "gzip")
+        self.assertEqual(choose_encoding("", variants), "identity")
+        self.assertEqual(choose_encoding("br", {"identity": b""}), "identity")
+
+    def test_catalogue_version_change_invalidates_entries(self):
+        self.cache.set("a", b"1", "application/json")
+        self.version = 2
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["catalogue_version"], 2)
+
+
+class TestStatIndex(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        stats = {
+            1: [45, 49, 49, 65, 65, 45],
+            2: [60, 62, 63, 80, 80, 60],
+            3: [80, 82, 83, 100, 100, 80],
+            4: [39, 52, 43, 60, 50, 65],
+        }
+        for pokemon_id, values in stats.items():
+            pokemon = Pokemon.objects.create(
+                pokemon_id=pokemon_id, pokemon_name=f"pokemon-{pokemon_id}"
+            )
+            for stat_name, value in zip(STAT_NAMES, values):
+                PokemonStats.objects.create(
+                    pokemon=pokemon, base_stat_name=stat_name, base_stat_num=value
+                )
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "stat_index.npy")
+        build_stat_index(self.path)
+        self.index = StatIndex(self.path)
+
+    def test_build_stat_index(self):
+        self.assertEqual(build_stat_index(self.path), 4)
+        index = self.index.load()
+        self.assertEqual(index.shape, (4,))
+        self.assertEqual(index["pokemon_id"].tolist(), [1, 2, 3, 4])
+        self.assertEqual(index["stats"].dtype, np.float32)
+        self.assertEqual(index["stats"][0].tolist(), [45, 49, 49, 65, 65, 45])
+        self.assertTrue(np.shares_memory(index["stats"], index))
+
+    def test_missing_or_old_index_not_built_on_load(self):
+        missing = StatIndex(os.path.join(os.path.dirname(self.path), "missing.npy"))
+        with patch("pokemons.stat_index.build_stat_index") as mock_build_stat_index:
+            with self.assertRaises(StatIndexUnavailable):
+                missing.load()
+
+            np.save(self.path, np.zeros((1, 7), dtype=np.int32))
+            with self.assertRaises(StatIndexUnavailable):
+                StatIndex(self.path).load()
+
+        mock_build_stat_index.assert_not_called()
+        self.assertFalse(os.path.exists(missing.path))
+
+    def test_nearest_neighbours(self):
+        results = self.index.search(like_id=1, k=2)
+        self.assertEqual([pokemon_id for pokemon_id, _, _ in results], [4, 2])
+
+        results = self.index.search(like_id=1, k=1, metric="cosine")
+        self.assertEqual(results[0][0], 2)
+
+    def test_range_query(self):
+        results = self.index.search(bounds={"speed": (60, None), "hp": (None, 70)})
+        self.assertEqual([pokemon_id for pokemon_id, _, _ in results], [2, 4])
+        self.assertIsNone(results[0][1])
+
+    def test_unknown_pokemon(self):
+        with self.assertRaises(KeyError):
+            self.index.search(like_id=99)
+
+    def test_stat_search_view(self):
+        client = APIClient()
+        with patch("pokemons.views.stat_index", self.index):
+            response = client.get("/stat-search?like=pokemon-1&k=1")
+            bad_metric = client.get("/stat-search?like=pokemon-1&metric=manhattan")
+            missing = client.get("/stat-search?like=missingno")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["pokemon_name"], "pokemon-4")
+        self.assertEqual(response.data["results"][0]["stats"]["speed"], 65)
+        self.assertEqual(bad_metric.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stat_search_view_without_index(self):
+        unbuilt = StatIndex(os.path.join(os.path.dirname(self.path), "missing.npy"))
+        with patch("pokemons.views.stat_index", unbuilt):
+            response = APIClient().get("/stat-search?min_speed=60")
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_build_stat_index_command(self):
+        os.remove(self.path)
+        with self.settings(STAT_INDEX_PATH=self.path):
+            call_command("build_stat_index")
+
+        self.assertEqual(self.index.load()["pokemon_id"].tolist(), [1, 2, 3, 4])
+
+
 class TestPokemonViewsIntegration(TestCase):
+    databases = "__all__"
+
     def setUp(self):
+        response_cache.clear()
+
         # Set up test data in the database
         pokemon_bulbasaur = Pokemon.objects.create(
             pokemon_id=1,
@@ -44,7 +293,9 @@ class TestPokemonViewsIntegration(TestCase):
             ability_name="chlorophyll", is_hidden=False, pokemon=pokemon_bulbasaur
         )
         PokemonType.objects.create(
-            type_name="grass", type_url="https://pokeapi.co/api/v2/type/12/", pokemon=pokemon_bulbasaur
+            type_name="grass",
+            type_url="https://pokeapi.co/api/v2/type/12/",
+            pokemon=pokemon_bulbasaur,
         )
         PokemonStats.objects.create(
             base_stat_name="speed",
@@ -67,7 +318,10 @@ class TestPokemonViewsIntegration(TestCase):
                 "base_experience": 64,
                 "abilities": [{"ability_name": "chlorophyll", "is_hidden": False}],
                 "types": [
-                    {"type_name": "grass", "type_url": "https://pokeapi.co/api/v2/type/12/"}
+                    {
+                        "type_name": "grass",
+                        "type_url": "https://pokeapi.co/api/v2/type/12/",
+                    }
                 ],
                 "stats": [
                     {"base_stat_name": "speed", "effort": 0, "base_stat_num": 45}
@@ -86,6 +340,205 @@ class TestPokemonViewsIntegration(TestCase):
         response = client.get("/all-pokemons")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_changes_view(self):
+        PokemonChange.objects.create(pokemon_id=1, action=PokemonChange.CREATED)
+        deleted = PokemonChange.objects.create(
+            pokemon_id=2, action=PokemonChange.DELETED
+        )
+        client = APIClient()
+
+        response = client.get("/changes?limit=1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["changes"]), 1)
+        self.assertEqual(response.data["changes"][0]["action"], "created")
+        self.assertEqual(
+            response.data["changes"][0]["pokemon"]["pokemon_name"], "Bulbasaur"
+        )
+        self.assertTrue(response.data["has_more"])
+
+        response = client.get(f"/changes?since={response.data['next_cursor']}")
+        self.assertEqual(
+            response.data["changes"],
+            [
+                {
+                    "seq": deleted.seq,
+                    "pokemon_id": 2,
+                    "action": "deleted",
+                    "pokemon": None,
+                }
+            ],
+        )
+        self.assertEqual(response.data["next_cursor"], deleted.seq)
+        self.assertFalse(response.data["has_more"])
+
+    def test_changes_view_invalid_cursor(self):
+        client = APIClient()
+        response = client.get("/changes?since=abc")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pokemon_details_served_from_cache(self):
+        client = APIClient()
+        first = client.get("/pokemon/Bulbasaur")
+
+        with patch("pokemons.views.RetrieveAPIView.get") as mock_get:
+            second = client.get("/pokemon/Bulbasaur")
+
+        mock_get.assert_not_called()
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(response_cache.stats()["hits"], 1)
+
+    def test_cache_key_normalises_field_selection(self):
+        client = APIClient()
+        first = client.get("/pokemon/Bulbasaur?fields=types.type_name,pokemon_id")
+        second = client.get("/pokemon/Bulbasaur?fields=pokemon_id,%20types.type_name")
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(response_cache.stats()["hits"], 1)
+
+    def test_cache_bypassed_for_other_params_and_accept_parameters(self):
+        client = APIClient()
+        client.get("/pokemon/Bulbasaur?utm_source=newsletter")
+        indented = client.get(
+            "/pokemon/Bulbasaur", HTTP_ACCEPT="application/json; indent=4"
+        )
+        plain = client.get("/pokemon/Bulbasaur", HTTP_ACCEPT="application/json;q=0.9")
+
+        self.assertIn(b"\n    ", indented.content)
+        self.assertNotIn(b"\n", plain.content)
+        self.assertEqual(response_cache.stats()["entries"], 1)
+        self.assertEqual(response_cache.stats()["hits"], 0)
+
+    def test_pokemon_details_sparse_fields(self):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                "/pokemon/Bulbasaur?fields=pokemon_id,types.type_name"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(), {"pokemon_id": 1, "types": [{"type_name": "grass"}]}
+        )
+        sql = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertNotIn("pokemonability", sql)
+        self.assertNotIn("pokemonstats", sql)
+        self.assertNotIn("type_url", sql)
+        self.assertNotIn("base_experience", sql)
+
+    def test_pokemon_details_include(self):
+        client = APIClient()
+        response = client.get("/pokemon/Bulbasaur?include=stats")
+        self.assertEqual(
+            list(response.json()),
+            [
+                "pokemon_id",
+                "pokemon_name",
+                "height",
+                "weight",
+                "base_experience",
+                "stats",
+            ],
+        )
+
+    def test_empty_field_selection_returns_full_document(self):
+        client = APIClient()
+        full = client.get("/pokemon/Bulbasaur")
+        with patch(
+            "pokemons.views.parse_field_selection", wraps=parse_field_selection
+        ) as mock_parse:
+            response = client.get("/pokemon/Bulbasaur?fields=&include=types")
+
+        mock_parse.assert_called_once()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(response.json()),
+            [
+                "pokemon_id",
+                "pokemon_name",
+                "height",
+                "weight",
+                "base_experience",
+                "types",
+            ],
+        )
+
+        response_cache.clear()
+        response = client.get("/pokemon/Bulbasaur?fields=")
+        self.assertEqual(response.json(), full.json())
+
+    def test_sparse_fields_unknown_field(self):
+        client = APIClient()
+        response = client.get("/pokemon/Bulbasaur?fields=types.nope")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_all_pokemons_view_with_fields(self):
+        client = APIClient()
+        response = client.get("/all-pokemons?fields=pokemon_id&include=types")
+        self.assertEqual(
+            response.json(),
+            {
+                "pokemons": [
+                    {
+                        "pokemon_id": 1,
+                        "types": [
+                            {
+                                "type_name": "grass",
+                                "type_url": "https://pokeapi.co/api/v2/type/12/",
+                            }
+                        ],
+                    }
+                ]
+            },
+        )
+
+    def test_all_pokemons_view_orders_both_modes_alike(self):
+        for pokemon_id, name in [(2, "abra"), (3, "Zubat"), (4, "_missingno")]:
+            Pokemon.objects.create(pokemon_id=pokemon_id, pokemon_name=name)
+        client = APIClient()
+
+        names = client.get("/all-pokemons").json()["pokemon_names"]
+        documents = client.get("/all-pokemons?fields=pokemon_id").json()["pokemons"]
+
+        self.assertEqual(names, ["Bulbasaur", "Zubat", "_missingno", "abra"])
+        names_by_id = dict(Pokemon.objects.values_list("pokemon_id", "pokemon_name"))
+        self.assertEqual(
+            [names_by_id[pokemon["pokemon_id"]] for pokemon in documents], names
+        )
+
+    def test_changes_view_with_fields(self):
+        PokemonChange.objects.create(pokemon_id=1, action=PokemonChange.UPDATED)
+        client = APIClient()
+        response = client.get("/changes?fields=pokemon_name")
+        self.assertEqual(
+            response.data["changes"][0]["pokemon"], {"pokemon_name": "Bulbasaur"}
+        )
+
+    def test_oversized_response_not_cached_or_compressed(self):
+        client = APIClient()
+        with patch.object(response_cache, "max_bytes", 10), patch(
+            "pokemons.response_cache.compress_variants"
+        ) as mock_compress_variants:
+            response = client.get("/pokemon/Bulbasaur", HTTP_ACCEPT_ENCODING="br")
+
+        mock_compress_variants.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response_cache.stats()["entries"], 0)
+
+    def test_compressed_responses(self):
+        client = APIClient()
+        plain = client.get("/pokemon/Bulbasaur")
+        compressed = client.get("/pokemon/Bulbasaur", HTTP_ACCEPT_ENCODING="gzip, br")
+        gzipped = client.get("/pokemon/Bulbasaur", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        self.assertEqual(compressed["Content-Encoding"], "br")
+        self.assertIn("Accept-Encoding", compressed["Vary"])
+        self.assertEqual(brotli.decompress(compressed.content), plain.content)
+        self.assertEqual(gzip.decompress(gzipped.content), plain.content)
+
     def test_page_not_found_view(self):
         client = APIClient()
         response = client.get("/bad-page")
@@ -1,5 +1,11 @@
 from django.urls import path
-from .views import GetAllPokemonsView, PokemonDetailsView
+from .views import (
+    GetAllPokemonsView,
+    PokemonChangesView,
+    PokemonDetailsView,
+    ResponseCacheStatsView,
+    StatSearchView,
+)
 
 urlpatterns = [
     path(
@@ -12,4 +18,19 @@ urlpatterns = [
         PokemonDetailsView.as_view(),
         name="pokemon-details",
     ),
+    path(
+        "changes",
+        PokemonChangesView.as_view(),
+        name="pokemon-changes",
+    ),
+    path(
+        "stat-search",
+        StatSearchView.as_view(),
+        name="stat-search",
+    ),
+    path(
+        "cache-stats",
+        ResponseCacheStatsView.as_view(),
+        name="cache-stats",
+    ),
 ]
@@ -1,18 +1,140 @@
-from .models import Pokemon
-from .serializers import PokemonSerializer
-from rest_framework.exceptions import APIException
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from .models import Pokemon, PokemonChange
+from .response_cache import choose_encoding, response_cache
+from .serializers import PokemonSerializer, parse_field_selection, split_param
+from .stat_index import METRICS, STAT_NAMES, StatIndexUnavailable, stat_index
+from rest_framework.exceptions import APIException, NotFound, ValidationError
 from rest_framework.generics import RetrieveAPIView
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+CHANGES_DEFAULT_LIMIT = 100
+CHANGES_MAX_LIMIT = 1000
+STAT_SEARCH_DEFAULT_K = 10
+STAT_SEARCH_MAX_K = 100
+# The only query parameters of a cacheable request, and part of its cache key
+CACHE_KEY_PARAMS = ("fields", "include")
 
-class GetAllPokemonsView(APIView):
+
+class ServiceUnavailable(APIException):
+    status_code = 503
+    default_detail = "Service temporarily unavailable, try again later."
+    default_code = "service_unavailable"
+
+
+def parse_int_param(request, name, default) -> int:
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer."})
+    if parsed < 0:
+        raise ValidationError({name: "Must not be negative."})
+    return parsed
+
+
+class CachedResponseMixin:
+    """
+    Serve successful JSON GET responses from the per-worker response cache.
+
+    Bodies are compressed when first cached, and each response carries the
+    variant matching the request's Accept-Encoding. Bodies too large for the cache are
+    neither cached nor compressed.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        cache_key = self.get_cache_key(request)
+        accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if cache_key is not None:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                variants, content_type = cached
+                response = HttpResponse(content_type=content_type)
+                return self.encode_response(response, variants, accept_encoding)
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        accepted_renderer = getattr(response, "accepted_renderer", None)
+        if (
+            cache_key is not None
+            and response.status_code == 200
+            and accepted_renderer is not None
+            and accepted_renderer.format == "json"
+        ):
+            response.render()
+            # A body that cannot fit in the cache is sent as is, without compressing it.
+            if len(response.content) > response_cache.max_bytes:
+                return response
+            variants = response_cache.set(
+                cache_key, response.content, response["Content-Type"]
+            )
+            return self.encode_response(response, variants, accept_encoding)
+        return response
+
+    def encode_response(self, response, variants, accept_encoding):
+        encoding = choose_encoding(accept_encoding, variants)
+        response.content = variants[encoding]
+        if encoding != "identity":
+            response["Content-Encoding"] = encoding
+        # The cached body depends on content negotiation as well as on the encoding.
+        patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+        return response
+
+    def get_cache_key(self, request):
+        """
+        Build the cache key from the path and the normalised ``fields`` and ``include`` parameters.
+
+        Returns None for requests that must not be cached: non-GET requests, requests with
+        any other query parameter, the browsable API, and Accept media types with parameters
+        such as ``indent``, which change the rendered body.
+        """
+        if request.method != "GET" or set(request.GET) - set(CACHE_KEY_PARAMS):
+            return None
+        for media_range in request.META.get("HTTP_ACCEPT", "").split(","):
+            media_type, _, params = media_range.partition(";")
+            if media_type.strip() == "text/html":
+                return None
+            for param in filter(None, (param.strip() for param in params.split(";"))):
+                if not param.startswith("q="):
+                    return None
+
+        key = request.path
+        for name in CACHE_KEY_PARAMS:
+            items = sorted(set(split_param(request.GET.get(name))))
+            if items:
+                key += f"|{name}={','.join(items)}"
+        return key
+
+
+class GetAllPokemonsView(CachedResponseMixin, APIView):
     """
     View for fetching a sorted list of all Pokemon names.
+
+    With ``fields`` or ``include`` query parameters, returns the selected fields of every
+    Pokemon instead, in the same order as the names.
     """
 
     def get(self, request) -> Response:
+        selection = parse_field_selection(request.query_params)
         try:
+            if selection is not None:
+                # Sort like the names below; the selection may not include the name.
+                pokemon_names = dict(
+                    Pokemon.objects.values_list("pokemon_id", "pokemon_name")
+                )
+                pokemons = sorted(
+                    PokemonSerializer.setup_eager_loading(
+                        Pokemon.objects.all(), selection
+                    ),
+                    key=lambda pokemon: str(pokemon_names.get(pokemon.pokemon_id)),
+                )
+                serializer = PokemonSerializer(pokemons, many=True, selection=selection)
+                return Response({"pokemons": serializer.data})
+
             all_pokemon_names = Pokemon.objects.values_list("pokemon_name", flat=True)
             sorted_pokemon_names = sorted(all_pokemon_names, key=str)
             return Response({"pokemon_names": sorted_pokemon_names})
@@ -22,11 +144,157 @@ class GetAllPokemonsView(APIView):
             ) from err
 
 
-class PokemonDetailsView(RetrieveAPIView):
+class PokemonDetailsView(CachedResponseMixin, RetrieveAPIView):
     """
     View for fetching details of a specific Pokemon by name.
+
+    Supports the ``fields`` and ``include`` query parameters to return a subset of the document.
     """
 
     lookup_field = "pokemon_name"
     queryset = Pokemon.objects.all()
     serializer_class = PokemonSerializer
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.selection = parse_field_selection(request.query_params)
+
+    def get_queryset(self):
+        return PokemonSerializer.setup_eager_loading(
+            super().get_queryset(), self.selection
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("selection", self.selection)
+        return super().get_serializer(*args, **kwargs)
+
+
+class PokemonChangesView(APIView):
+    """
+    View for fetching Pokemon changed after a cursor, in change sequence order.
+
+    Query parameters:
+        since (int): The last sequence number already seen. Defaults to 0.
+        limit (int): The maximum number of changes to return.
+        fields, include: Select the parts of each Pokemon document to return.
+    """
+
+    def get(self, request) -> Response:
+        selection = parse_field_selection(request.query_params)
+        since = parse_int_param(request, "since", 0)
+        limit = parse_int_param(request, "limit", CHANGES_DEFAULT_LIMIT)
+        limit = min(max(limit, 1), CHANGES_MAX_LIMIT)
+
+        changes = list(
+            PokemonChange.objects.filter(seq__gt=since).order_by("seq")[: limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        changed_ids = {
+            change.pokemon_id
+            for change in changes
+            if change.action != PokemonChange.DELETED
+        }
+        pokemons = PokemonSerializer.setup_eager_loading(
+            Pokemon.objects.all(), selection
+        ).in_bulk(changed_ids)
+
+        results = []
+        for change in changes:
+            pokemon = pokemons.get(change.pokemon_id)
+            results.append(
+                {
+                    "seq": change.seq,
+                    "pokemon_id": change.pokemon_id,
+                    "action": change.action,
+                    "pokemon": PokemonSerializer(pokemon, selection=selection).data
+                    if pokemon
+                    else None,
+                }
+            )
+
+        return Response(
+            {
+                "changes": results,
+                "next_cursor": changes[-1].seq if changes else since,
+                "has_more": has_more,
+            }
+        )
+
+
+class StatSearchView(APIView):
+    """
+    View for finding Pokemon by base stats.
+
+    Query parameters:
+        like (str): A Pokemon name. Results are the Pokemon with the most similar base stats.
+        k (int): The maximum number of results.
+        metric (str): "euclidean" (default) or "cosine".
+        min_<stat>, max_<stat> (int): Inclusive bounds on a base stat, e.g. min_speed=100.
+            Stat names use underscores, e.g. max_special_attack.
+    """
+
+    def get(self, request) -> Response:
+        k = parse_int_param(request, "k", STAT_SEARCH_DEFAULT_K)
+        k = min(max(k, 1), STAT_SEARCH_MAX_K)
+
+        metric = request.query_params.get("metric", "euclidean")
+        if metric not in METRICS:
+            raise ValidationError({"metric": f"Must be one of {', '.join(METRICS)}."})
+
+        bounds = {}
+        for stat_name in STAT_NAMES:
+            param = stat_name.replace("-", "_")
+            low = parse_int_param(request, f"min_{param}", None)
+            high = parse_int_param(request, f"max_{param}", None)
+            if low is not None or high is not None:
+                bounds[stat_name] = (low, high)
+
+        like_id = None
+        like = request.query_params.get("like")
+        if like is not None:
+            like_id = (
+                Pokemon.objects.filter(pokemon_name=like)
+                .values_list("pokemon_id", flat=True)
+                .first()
+            )
+            if like_id is None:
+                raise NotFound(f"Pokemon {like} not found.")
+
+        try:
+            matches = stat_index.search(like_id, k, metric, bounds)
+        except StatIndexUnavailable:
+            raise ServiceUnavailable("The stat index has not been built yet.")
+        except KeyError:
+            raise NotFound(f"Pokemon {like} has no stats indexed yet.")
+
+        names = dict(
+            Pokemon.objects.filter(
+                pokemon_id__in=[pokemon_id for pokemon_id, _, _ in matches]
+            ).values_list("pokemon_id", "pokemon_name")
+        )
+        return Response(
+            {
+                "results": [
+                    {
+                        "pokemon_id": pokemon_id,
+                        "pokemon_name": names.get(pokemon_id),
+                        "distance": distance,
+                        "stats": dict(zip(STAT_NAMES, stats)),
+                    }
+                    for pokemon_id, distance, stats in matches
+                ]
+            }
+        )
+
+
+class ResponseCacheStatsView(APIView):
+    """
+    View for fetching hit rate and memory use of this worker's response cache.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request) -> Response:
+        return Response(response_cache.stats())